@@ -7,25 +7,40 @@ import sys
 import json
 import os
 import time
+import argparse
+import importlib.util
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
 from pathlib import Path
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Tuple
 
 # Test results storage
+# Individual entries are streamed to RESULTS_LOG (one JSON object per line) as they happen;
+# only the run summary is kept in memory.
+RESULTS_LOG = Path("test_results_automated.jsonl")
+
 test_results = {
     "timestamp": time.time(),
-    "tests": [],
     "summary": {}
 }
 
+_results_fp = None
+_results_lock = threading.Lock()
+
 def log_test(name: str, status: str, details: str = "", error: str = ""):
     """Log test result"""
-    test_results["tests"].append({
+    entry = {
         "name": name,
         "status": status,
         "details": details,
         "error": error,
         "timestamp": time.time()
-    })
+    }
+    with _results_lock:
+        if _results_fp is not None:
+            _results_fp.write(json.dumps(entry) + "\n")
+            _results_fp.flush()
     status_icon = "✅" if status == "PASS" else "❌" if status == "FAIL" else "⚠️"
     print(f"{status_icon} {name}: {status}")
     if details:
@@ -33,6 +48,50 @@ def log_test(name: str, status: str, details: str = "", error: str = ""):
     if error:
         print(f"   ERROR: {error}")
 
+@lru_cache(maxsize=None)
+def _discover_pdfs() -> Tuple[str, ...]:
+    """Find test PDFs in uploads/ (walked once per run, shared by all tests)"""
+    uploads_dir = Path("uploads")
+    if not uploads_dir.exists():
+        return ()
+    return tuple(str(pdf) for pdf in uploads_dir.glob("*.pdf"))
+
+@lru_cache(maxsize=None)
+def _discover_images() -> Tuple[str, ...]:
+    """
+    Find up to 2 test images in public/diagrams/extracted/ (walked once per run).
+    Called lazily so images produced by Module A are picked up.
+    """
+    return _first_pngs_under("public/diagrams/extracted", limit=2)
+
+def _first_pngs_under(root: str, limit: int) -> Tuple[str, ...]:
+    """
+    Return up to `limit` PNG paths from the subdirectories of root (at most 2 per subdir).
+    Uses os.scandir so entry types come from the directory listing instead of a stat() per entry.
+    """
+    found = []
+    try:
+        top_entries = os.scandir(root)
+    except OSError:
+        return ()
+    
+    with top_entries:
+        for subdir in top_entries:
+            if not subdir.is_dir(follow_symlinks=False):
+                continue
+            per_dir = 0
+            with os.scandir(subdir.path) as entries:
+                for entry in entries:
+                    if entry.name.endswith(".png") and entry.is_file():
+                        found.append(entry.path)
+                        per_dir += 1
+                        if per_dir >= 2 or len(found) >= limit:
+                            break
+            if len(found) >= limit:
+                break
+    
+    return tuple(found)
+
 def test_module_a_pdf_extraction():
     """Test Module A: PDF Extraction"""
     print("\n" + "="*60)
@@ -40,20 +99,17 @@ def test_module_a_pdf_extraction():
     print("="*60)
     
     try:
-        from scripts.pdf_extractor import extract_diagrams
-        
         # Find a test PDF
-        test_pdf = None
-        uploads_dir = Path("uploads")
-        if uploads_dir.exists():
-            pdfs = list(uploads_dir.glob("*.pdf"))
-            if pdfs:
-                test_pdf = str(pdfs[0])
+        pdfs = _discover_pdfs()
+        test_pdf = pdfs[0] if pdfs else None
         
         if not test_pdf:
             log_test("PDF Extraction", "SKIP", "No test PDF found in uploads/")
             return False
         
+        # Import only once we know the test will run (pulls in PyMuPDF)
+        from scripts.pdf_extractor import extract_diagrams
+        
         print(f"Using test PDF: {test_pdf}")
         
         # Extract diagrams
@@ -83,24 +139,16 @@ def test_module_b_hashing():
     print("="*60)
     
     try:
-        from scripts.image_hashing import ImageHasher
-        
         # Find a test image
-        diagrams_dir = Path("public/diagrams/extracted")
-        test_image = None
-        
-        if diagrams_dir.exists():
-            for subdir in diagrams_dir.iterdir():
-                if subdir.is_dir():
-                    images = list(subdir.glob("*.png"))
-                    if images:
-                        test_image = str(images[0])
-                        break
+        images = _discover_images()
+        test_image = images[0] if images else None
         
         if not test_image:
             log_test("Image Hashing", "SKIP", "No test images found. Run PDF extraction first.")
             return False
         
+        from scripts.image_hashing import ImageHasher
+        
         print(f"Using test image: {test_image}")
         
         # Test hashing
@@ -137,25 +185,16 @@ def test_module_c_opencv():
     print("="*60)
     
     try:
-        import cv2
-        from scripts.opencv_compare import OpenCVComparator
-        
         # Find test images
-        diagrams_dir = Path("public/diagrams/extracted")
-        test_images = []
-        
-        if diagrams_dir.exists():
-            for subdir in diagrams_dir.iterdir():
-                if subdir.is_dir():
-                    images = list(subdir.glob("*.png"))
-                    test_images.extend([str(img) for img in images[:2]])
-                    if len(test_images) >= 2:
-                        break
+        test_images = list(_discover_images())
         
         if len(test_images) < 2:
             log_test("OpenCV Comparison", "SKIP", "Need at least 2 images for comparison")
             return False
         
+        import cv2
+        from scripts.opencv_compare import OpenCVComparator
+        
         print(f"Comparing: {test_images[0]} vs {test_images[1]}")
         
         comparator = OpenCVComparator()
@@ -183,25 +222,21 @@ def test_module_d_selenium():
     print("="*60)
     
     try:
-        from selenium import webdriver
-        from scripts.auto_reverse_search import ReverseImageSearcher
-        
         # Find a test image
-        diagrams_dir = Path("public/diagrams/extracted")
-        test_image = None
-        
-        if diagrams_dir.exists():
-            for subdir in diagrams_dir.iterdir():
-                if subdir.is_dir():
-                    images = list(subdir.glob("*.png"))
-                    if images:
-                        test_image = str(images[0])
-                        break
+        images = _discover_images()
+        test_image = images[0] if images else None
         
         if not test_image:
             log_test("Selenium Reverse Search", "SKIP", "No test images found")
             return False
         
+        if importlib.util.find_spec("selenium") is None:
+            log_test("Selenium Reverse Search", "SKIP", "Selenium not installed")
+            return False
+        
+        from selenium import webdriver
+        from scripts.auto_reverse_search import ReverseImageSearcher
+        
         print(f"Testing with image: {test_image}")
         print("Note: This test will open a browser window briefly")
         
@@ -229,20 +264,16 @@ def test_module_f_plagiarism_engine():
     print("="*60)
     
     try:
-        from scripts.plagiarism_engine import PlagiarismEngine
-        
         # Find a test PDF
-        test_pdf = None
-        uploads_dir = Path("uploads")
-        if uploads_dir.exists():
-            pdfs = list(uploads_dir.glob("*.pdf"))
-            if pdfs:
-                test_pdf = str(pdfs[0])
+        pdfs = _discover_pdfs()
+        test_pdf = pdfs[0] if pdfs else None
         
         if not test_pdf:
             log_test("Plagiarism Engine", "SKIP", "No test PDF found")
             return False
         
+        from scripts.plagiarism_engine import PlagiarismEngine
+        
         print(f"Testing with PDF: {test_pdf}")
         
         engine = PlagiarismEngine()
@@ -277,7 +308,8 @@ def test_database():
             log_test("Database", "SKIP", "Database not created yet")
             return False
         
-        conn = sqlite3.connect(str(db_path))
+        # Autocommit mode: read-only checks don't need an implicit BEGIN/COMMIT
+        conn = sqlite3.connect(str(db_path), isolation_level=None)
         cursor = conn.cursor()
         
         # Check table exists
@@ -291,10 +323,10 @@ def test_database():
             
             # Check schema
             cursor.execute("PRAGMA table_info(diagram_hashes)")
-            columns = [row[1] for row in cursor.fetchall()]
+            columns = {row[1] for row in cursor}
             
-            required_columns = ['id', 'filePath', 'pHash', 'dHash', 'aHash']
-            has_all = all(col in columns for col in required_columns)
+            required_columns = {'id', 'filePath', 'pHash', 'dHash', 'aHash'}
+            has_all = required_columns.issubset(columns)
             
             conn.close()
             
@@ -302,7 +334,7 @@ def test_database():
                 log_test("Database", "PASS", f"Table exists with {count} records, all required columns present")
                 return True
             else:
-                log_test("Database", "FAIL", f"Missing columns. Found: {columns}")
+                log_test("Database", "FAIL", f"Missing columns. Found: {sorted(columns)}")
                 return False
         else:
             conn.close()
@@ -343,15 +375,20 @@ def test_file_structure():
     
     all_good = True
     
+    # Overlap the stat() calls; results are logged afterwards in the original order
+    all_paths = required_files + required_dirs
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        exists = dict(zip(all_paths, executor.map(lambda p: Path(p).exists(), all_paths)))
+    
     for file_path in required_files:
-        if Path(file_path).exists():
+        if exists[file_path]:
             log_test(f"File: {file_path}", "PASS", "")
         else:
             log_test(f"File: {file_path}", "FAIL", "File not found")
             all_good = False
     
     for dir_path in required_dirs:
-        if Path(dir_path).exists():
+        if exists[dir_path]:
             log_test(f"Directory: {dir_path}", "PASS", "")
         else:
             log_test(f"Directory: {dir_path}", "FAIL", "Directory not found")
@@ -380,56 +417,97 @@ def test_dependencies():
     all_required = True
     optional_available = []
     
+    # find_spec only runs the finder chain - no module code or C extension init
     for module, package in required.items():
         try:
-            __import__(module)
+            if importlib.util.find_spec(module) is None:
+                raise ImportError(module)
             log_test(f"Required: {package}", "PASS", "")
-        except ImportError:
+        except (ImportError, ValueError):
             log_test(f"Required: {package}", "FAIL", f"Module {module} not found")
             all_required = False
     
     for module, package in optional.items():
         try:
-            __import__(module)
+            if importlib.util.find_spec(module) is None:
+                raise ImportError(module)
             log_test(f"Optional: {package}", "PASS", "")
             optional_available.append(package)
-        except ImportError:
+        except (ImportError, ValueError):
             log_test(f"Optional: {package}", "SKIP", f"Not installed (optional)")
     
     return all_required
 
-def main():
+def run_test(name: str, test_func) -> bool:
+    """Run a single test, converting unexpected exceptions into a FAIL"""
+    try:
+        return test_func()
+    except Exception as e:
+        log_test(name, "FAIL", error=f"Unexpected error: {e}")
+        return False
+
+def _run_tests(tests, results: Dict[str, bool], workers: int):
+    """Run the test table, overlapping independent tests when workers > 1"""
+    if workers > 1:
+        # Serial tests first (later read-only tests may depend on their output),
+        # then overlap the independent I/O-bound tests in a thread pool
+        for name, test_func, serial in tests:
+            if serial:
+                results[name] = run_test(name, test_func)
+        
+        parallel_tests = [(name, test_func) for name, test_func, serial in tests if not serial]
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            futures = {name: executor.submit(run_test, name, test_func) for name, test_func in parallel_tests}
+            for name, future in futures.items():
+                results[name] = future.result()
+    else:
+        for name, test_func, _ in tests:
+            results[name] = run_test(name, test_func)
+            sys.stdout.flush()  # Keep per-test output grouped when piped
+
+def main(workers: int = 1):
     """Run all tests"""
+    global _results_fp
+    
     print("\n" + "🔍"*30)
     print("AUTOMATED TEST SUITE - DIAGRAM FORENSICS ENGINE")
     print("🔍"*30 + "\n")
     
     # Run all tests
+    # serial=True: writes shared state (extracted files, SQLite DB) or drives a browser,
+    # so it must run alone and in order. Everything else is read-only and independent.
     tests = [
-        ("File Structure", test_file_structure),
-        ("Dependencies", test_dependencies),
-        ("Database", test_database),
-        ("Module A: PDF Extraction", test_module_a_pdf_extraction),
-        ("Module B: Image Hashing", test_module_b_hashing),
-        ("Module C: OpenCV", test_module_c_opencv),
-        ("Module D: Selenium", test_module_d_selenium),
-        ("Module F: Plagiarism Engine", test_module_f_plagiarism_engine),
+        ("File Structure", test_file_structure, False),
+        ("Dependencies", test_dependencies, False),
+        ("Database", test_database, False),
+        ("Module A: PDF Extraction", test_module_a_pdf_extraction, True),
+        ("Module B: Image Hashing", test_module_b_hashing, True),
+        ("Module C: OpenCV", test_module_c_opencv, False),
+        ("Module D: Selenium", test_module_d_selenium, True),
+        ("Module F: Plagiarism Engine", test_module_f_plagiarism_engine, True),
     ]
     
     results = {}
-    for name, test_func in tests:
-        try:
-            results[name] = test_func()
-        except Exception as e:
-            log_test(name, "FAIL", error=f"Unexpected error: {e}")
-            results[name] = False
-        time.sleep(0.5)  # Small delay between tests
+    _results_fp = open(RESULTS_LOG, 'w')
+    try:
+        _run_tests(tests, results, workers)
+    finally:
+        with _results_lock:
+            _results_fp.close()
+            _results_fp = None
     
-    # Generate summary
+    # Generate summary (single pass over the streamed entries)
     passed = sum(1 for v in results.values() if v)
     total = len(results)
-    skipped = sum(1 for t in test_results["tests"] if t["status"] == "SKIP")
-    failed = sum(1 for t in test_results["tests"] if t["status"] == "FAIL")
+    skipped = 0
+    failed = 0
+    with open(RESULTS_LOG) as f:
+        for line in f:
+            status = json.loads(line)["status"]
+            if status == "SKIP":
+                skipped += 1
+            elif status == "FAIL":
+                failed += 1
     
     test_results["summary"] = {
         "total": total,
@@ -438,6 +516,7 @@ def main():
         "skipped": skipped,
         "pass_rate": f"{(passed/total*100):.1f}%" if total > 0 else "0%"
     }
+    test_results["tests_log"] = str(RESULTS_LOG)
     
     # Print summary
     print("\n" + "="*60)
@@ -449,16 +528,27 @@ def main():
     print(f"⚠️  Skipped: {skipped}")
     print(f"Pass Rate: {test_results['summary']['pass_rate']}")
     
-    # Save results
+    # Save the run summary; per-test entries are already in RESULTS_LOG
     results_file = Path("test_results_automated.json")
     with open(results_file, 'w') as f:
         json.dump(test_results, f, indent=2)
     
-    print(f"\n📄 Detailed results saved to: {results_file}")
+    print(f"\n📄 Summary saved to: {results_file}")
+    print(f"📄 Detailed results saved to: {RESULTS_LOG}")
     
     return passed == total - skipped  # Pass if all non-skipped tests passed
 
 if __name__ == "__main__":
-    success = main()
+    parser = argparse.ArgumentParser(
+        description="Run the Diagram Forensics Engine test suite"
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        default=1,
+        help="Run independent tests concurrently with this many threads (default: 1, fully serial)"
+    )
+    args = parser.parse_args()
+    
+    success = main(workers=args.workers)
     sys.exit(0 if success else 1)
-
@@ -0,0 +1,100 @@
+# cython: language_level=3, boundscheck=False, wraparound=False
+r"""
+Compiled single-pass scanner for ContentChecker batch mode.
+
+Walks the text once, collecting citation bracket groups and figure callout
+counts with the same semantics as the regex path in content_checker.py
+(\[([^\[\]]+)\] and \b(?:fig\.?|figure)\s*(\d+), case-insensitive).
+
+Build in place with:
+    cythonize -i _content_scanner.pyx
+"""
+
+
+cdef inline bint _is_word(Py_UCS4 c):
+    # Same definition as the regex \w class
+    return c.isalnum() or c == u'_'
+
+
+cdef inline bint _ascii_ieq(Py_UCS4 c, Py_UCS4 lower):
+    # ASCII case fold; lower is always a lowercase ASCII letter
+    return (<unsigned int>c | 0x20) == <unsigned int>lower
+
+
+cdef Py_ssize_t _skip_space(str text, Py_ssize_t pos, Py_ssize_t n):
+    while pos < n and text[pos].isspace():
+        pos += 1
+    return pos
+
+
+cdef Py_ssize_t _figure_number_start(str text, Py_ssize_t i, Py_ssize_t n):
+    """Returns where the digits of a callout starting at i begin, or -1."""
+    cdef Py_ssize_t pos = i + 3
+
+    # fig\.?\s*\d+
+    if pos < n and text[pos] == u'.':
+        pos += 1
+    pos = _skip_space(text, pos, n)
+    if pos < n and text[pos].isdecimal():
+        return pos
+
+    # figure\s*\d+
+    pos = i + 3
+    if (pos + 2 < n and _ascii_ieq(text[pos], u'u') and
+            _ascii_ieq(text[pos + 1], u'r') and _ascii_ieq(text[pos + 2], u'e')):
+        pos = _skip_space(text, pos + 3, n)
+        if pos < n and text[pos].isdecimal():
+            return pos
+
+    return -1
+
+
+def scan(str text):
+    """
+    Scans text for citation brackets and figure callouts.
+
+    Returns:
+        (groups, figure_counts): the contents of every [..] group in order, and
+        a dict mapping figure number -> number of callouts.
+    """
+    cdef Py_ssize_t n = len(text)
+    cdef Py_ssize_t i = 0, j, digits_start, pos
+    cdef Py_ssize_t bracket_resume = 0, figure_resume = 0
+    cdef bint brackets_done = False
+    cdef Py_UCS4 c
+
+    groups = []
+    figure_counts = {}
+
+    while i < n:
+        c = text[i]
+
+        if c == u'[' and not brackets_done and i >= bracket_resume:
+            j = i + 1
+            while j < n and text[j] != u']' and text[j] != u'[':
+                j += 1
+            if j >= n:
+                # No bracket anywhere ahead - no later group can match either
+                brackets_done = True
+            elif text[j] == u'[':
+                # Unclosed before the next '[' (e.g. [0, 1) or [[1]]) - resume there
+                bracket_resume = j
+            elif j > i + 1:
+                groups.append(text[i + 1:j])
+                bracket_resume = j + 1
+
+        elif (i >= figure_resume and _ascii_ieq(c, u'f') and i + 2 < n and
+                _ascii_ieq(text[i + 1], u'i') and _ascii_ieq(text[i + 2], u'g') and
+                (i == 0 or not _is_word(text[i - 1]))):
+            digits_start = _figure_number_start(text, i, n)
+            if digits_start >= 0:
+                pos = digits_start
+                while pos < n and text[pos].isdecimal():
+                    pos += 1
+                number = int(text[digits_start:pos])
+                figure_counts[number] = figure_counts.get(number, 0) + 1
+                figure_resume = pos
+
+        i += 1
+
+    return groups, figure_counts
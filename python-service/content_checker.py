@@ -1,16 +1,146 @@
 import re
 import logging
-from typing import List, Dict, Any, Tuple
+import functools
+import threading
+from collections import Counter
+from typing import List, Dict, Any, Tuple, Set
 
 logger = logging.getLogger(__name__)
 
+# Optional C-backed multi-pattern matcher for author-name scans
+try:
+    import ahocorasick
+    AHOCORASICK_AVAILABLE = True
+except ImportError:
+    AHOCORASICK_AVAILABLE = False
+
+# Optional DFA-based matcher for scanning all document patterns in one pass
+try:
+    import hyperscan
+    HYPERSCAN_AVAILABLE = True
+except ImportError:
+    HYPERSCAN_AVAILABLE = False
+
+# Optional compiled scanner (build with: cythonize -i _content_scanner.pyx)
+try:
+    import _content_scanner
+    CONTENT_SCANNER_AVAILABLE = True
+except ImportError:
+    CONTENT_SCANNER_AVAILABLE = False
+
+# Hyperscan pattern ids
+_HS_CITATION = 0
+_HS_FIGURE = 1
+_HS_REF_HEADING = 2
+
+_hs_database = None
+_hs_lock = threading.Lock()
+
+# Figure callouts: Fig. 1, Figure 1, Fig 1, figure 1
+_FIG_RE = re.compile(r'\b(?:fig\.?|figure)\s*(\d+)', re.IGNORECASE)
+
+# Shortest possible figure callout, e.g. "fig1"
+_MIN_FIG_CALLOUT_LEN = 4
+
+# Citation bracket groups and their contents: [1], [1, 2], [1-3]. A '[' never
+# matched by a ']' (e.g. the half-open interval [0, 1)) or an outer '[' as in [[1]]
+# must not swallow the following group, so groups cannot contain '['
+_BRACKET_RE = re.compile(r'\[([^\[\]]+)\]')
+_RANGE_RE = re.compile(r'(\d+)\s*[-\u2013]\s*(\d+)')
+_TOKEN_SPLIT_RE = re.compile(r'[,;\s]+')
+
+# Heading line that starts the reference list
+_REF_HEADING_RE = re.compile(r'\n\s*(references|bibliography)\s*\n', re.IGNORECASE)
+
+# Figure number at the end of a Hyperscan figure-callout match
+_TRAILING_DIGITS_RE = re.compile(r'\d+$')
+
+# Larger "ranges" are usually years or page spans, not citation ranges
+_MAX_RANGE_SPAN = 100
+
+# "et al." suffix stripped from author strings
+_ET_AL_RE = re.compile(r'\s+et\s+al\.?', re.IGNORECASE)
+
+
+def _is_word_char(char: str) -> bool:
+    """Mirrors the regex \\w class used for word-boundary checks."""
+    return char.isalnum() or char == '_'
+
+
+def _get_hs_database():
+    """Compiles the citation/figure/heading patterns into one Hyperscan database (once)."""
+    global _hs_database
+    if _hs_database is None:
+        # UTF8 + UCP give \s and \d the same Unicode semantics as the str regexes.
+        # UCP mode rejects \b, so the figure pattern's leading word boundary is
+        # checked on each match in scan_document instead.
+        som = hyperscan.HS_FLAG_SOM_LEFTMOST | hyperscan.HS_FLAG_UTF8 | hyperscan.HS_FLAG_UCP
+        caseless = hyperscan.HS_FLAG_CASELESS
+        database = hyperscan.Database()
+        database.compile(
+            expressions=[
+                rb'\[[^\[\]]+\]',
+                rb'(?:fig\.?|figure)\s*\d+',
+                rb'\n\s*(?:references|bibliography)\s*\n',
+            ],
+            ids=[_HS_CITATION, _HS_FIGURE, _HS_REF_HEADING],
+            elements=3,
+            flags=[som, som | caseless, som | caseless],
+        )
+        _hs_database = database
+    return _hs_database
+
+
+def _count_whole_word(text: str, word: str, limit: int) -> int:
+    """Counts whole-word occurrences of word in text, stopping at limit."""
+    count = 0
+    word_len = len(word)
+    text_len = len(text)
+    pos = text.find(word)
+    while pos != -1:
+        end = pos + word_len
+        if (pos == 0 or not _is_word_char(text[pos - 1])) and \
+                (end == text_len or not _is_word_char(text[end])):
+            count += 1
+            if count >= limit:
+                break
+        pos = text.find(word, pos + 1)
+    return count
+
+
+def _char_before(data: bytes, pos: int) -> str:
+    """Decodes the UTF-8 character that ends at byte offset pos ('' at the start)."""
+    begin = pos - 1
+    # Step back over continuation bytes (0b10xxxxxx) to the lead byte
+    while begin > 0 and pos - begin < 4 and 0x80 <= data[begin] < 0xC0:
+        begin -= 1
+    return data[max(begin, 0):pos].decode('utf-8', errors='ignore')
+
+
+@functools.lru_cache(maxsize=512)
+def _cite_re(n: int) -> re.Pattern:
+    """Compiled pattern matching citation number n inside brackets."""
+    # \[ matches literal [
+    # (?:[^\]]*[,\s-])? matches optional content before the number (non-closing-bracket chars)
+    # \b{n}\b matches the exact number
+    # (?:[,\s-][^\]]*)? matches optional content after the number
+    # \] matches literal ]
+    return re.compile(rf'\[(?:[^\]]*[,\s-])?\b{n}\b(?:[,\s-][^\]]*)?\]')
+
+
+@functools.lru_cache(maxsize=1024)
+def _name_re(name: str) -> re.Pattern:
+    """Compiled whole-word pattern for an author name."""
+    return re.compile(r'\b' + re.escape(name) + r'\b')
+
 class ContentChecker:
     """
     Checks if references and figures are cited in the text content.
     """
 
     @staticmethod
-    def check_reference_citation(text: str, reference_order: int, authors: str = None) -> Dict[str, Any]:
+    def check_reference_citation(text: str, reference_order: int, authors: str = None,
+                                 body_text: str = None) -> Dict[str, Any]:
         """
         Checks if a reference is cited in the text by number or author name.
         
@@ -18,6 +148,8 @@ class ContentChecker:
             text: The full text content of the PDF.
             reference_order: The reference number (e.g., 1 for [1]).
             authors: The author string (e.g., "Smith et al.").
+            body_text: Optional text with the reference section stripped
+                (see _split_body_refs); author names are then searched only here.
             
         Returns:
             Dict with 'valid' (bool) and 'reason' (str).
@@ -39,51 +171,309 @@ class ContentChecker:
         if f"[{reference_order}]" in text:
              return {'valid': True, 'reason': f"Found citation [{reference_order}]"}
              
+        # Plain substring probes for the common list/range forms before touching regex
+        n = reference_order
+        needles = (f"[{n},", f",{n}]", f", {n}]", f"[{n}-", f"-{n}]")
+        if any(needle in text for needle in needles):
+            return {'valid': True, 'reason': f"Found citation number {reference_order} in text"}
+            
         # Regex for more complex cases like [1, 2] or [1-5]
         # Look for the number surrounded by delimiters within brackets
         # This is a bit complex to regex perfectly across the whole file without context, 
         # but we can try to find the number in typical citation contexts.
         
         # Pattern: brackets containing the number, with optional other numbers/ranges
-        # \[ matches literal [
-        # (?:[^\]]*[,\s-])? matches optional content before the number (non-closing-bracket chars)
-        # \b{reference_order}\b matches the exact number
-        # (?:[,\s-][^\]]*)? matches optional content after the number
-        # \] matches literal ]
-        citation_pattern = re.compile(r'\[(?:[^\]]*[,\s-])?\b' + str(reference_order) + r'\b(?:[,\s-][^\]]*)?\]')
-        
-        if citation_pattern.search(text):
+        if _cite_re(reference_order).search(text):
             return {'valid': True, 'reason': f"Found citation number {reference_order} in text"}
 
         # Check 2: Author Name
-        if authors:
-            # Extract the first author's last name
-            # Typical formats: "Smith et al.", "Smith, J.", "John Smith"
-            # We'll try to find the first significant name part
-            
-            # Remove "et al."
-            clean_authors = re.sub(r'\s+et\s+al\.?', '', authors, flags=re.IGNORECASE)
-            
-            # Split by comma to get first author group if multiple
-            first_author_group = clean_authors.split(',')[0].strip()
-            
-            # Try to find a last name (usually the word before a comma or the last word)
-            # If "Smith, J.", split by comma -> "Smith"
-            # If "John Smith", split by space -> "Smith"
+        return ContentChecker._check_author_citation(text, authors, body_text=body_text)
+
+    @staticmethod
+    def build_citation_index(text: str) -> Set[int]:
+        """
+        Collects every reference number cited in bracket groups in one pass.
+        
+        Handles [1], [1, 2], [1; 4] and ranges such as [1-3] or [1–3],
+        so per-reference validation becomes a set lookup instead of a
+        full-text regex scan.
+        
+        Returns:
+            Set of cited reference numbers.
+        """
+        index: Set[int] = set()
+        if not text:
+            return index
+
+        for match in _BRACKET_RE.finditer(text):
+            ContentChecker._index_citation_group(index, match.group(1))
+
+        return index
+
+    @staticmethod
+    def _index_citation_group(index: Set[int], group: str) -> None:
+        """Adds the numbers cited in one bracket group's contents to index."""
+        # Expand ranges first, then drop them so their endpoints are not re-tokenized
+        for range_match in _RANGE_RE.finditer(group):
+            start, end = int(range_match.group(1)), int(range_match.group(2))
+            if start <= end and end - start <= _MAX_RANGE_SPAN:
+                index.update(range(start, end + 1))
+            else:
+                index.update((start, end))
+        group = _RANGE_RE.sub(' ', group)
+
+        for token in _TOKEN_SPLIT_RE.split(group):
+            if token.isdigit():
+                index.add(int(token))
+
+    @staticmethod
+    def scan_document(text: str) -> Dict[str, Any]:
+        """
+        Scans a document once for citations, figure callouts and the reference heading.
+        
+        With Hyperscan installed all patterns run in a single DFA pass over the
+        UTF-8 bytes. Otherwise the compiled _content_scanner extension (if built)
+        collects citations and figures in one pass, and failing that the
+        equivalent regex passes are used.
+        
+        Returns:
+            Dict with 'citations' (set of cited numbers, as build_citation_index),
+            'figure_counts' (Counter of figure numbers), and 'body'/'references'
+            (as _split_body_refs).
+        """
+        if not text:
+            return {'citations': set(), 'figure_counts': Counter(), 'body': '', 'references': ''}
+
+        if not HYPERSCAN_AVAILABLE and CONTENT_SCANNER_AVAILABLE:
+            groups, figure_counts = _content_scanner.scan(text)
+            citations: Set[int] = set()
+            for group in groups:
+                ContentChecker._index_citation_group(citations, group)
+            body, references = ContentChecker._split_body_refs(text)
+            return {
+                'citations': citations,
+                'figure_counts': Counter(figure_counts),
+                'body': body,
+                'references': references,
+            }
+
+        if not HYPERSCAN_AVAILABLE:
+            body, references = ContentChecker._split_body_refs(text)
+            return {
+                'citations': ContentChecker.build_citation_index(text),
+                'figure_counts': Counter(int(m.group(1)) for m in _FIG_RE.finditer(text)),
+                'body': body,
+                'references': references,
+            }
+
+        data = text.encode('utf-8')
+        citation_spans = {}
+        figure_spans = {}
+        headings = {}
+
+        def on_match(pattern_id, start, end, flags, context):
+            # Hyperscan reports every end offset; keep the longest match per start
+            if pattern_id == _HS_CITATION:
+                citation_spans[start] = max(end, citation_spans.get(start, end))
+            elif pattern_id == _HS_FIGURE:
+                figure_spans[start] = max(end, figure_spans.get(start, end))
+            else:
+                headings[start] = max(end, headings.get(start, end))
+
+        with _hs_lock:
+            _get_hs_database().scan(data, match_event_handler=on_match)
+
+        citations: Set[int] = set()
+        for start, end in citation_spans.items():
+            group = data[start + 1:end - 1].decode('utf-8', errors='ignore')
+            ContentChecker._index_citation_group(citations, group)
+
+        figure_counts = Counter()
+        for start, end in figure_spans.items():
+            if _is_word_char(_char_before(data, start)):
+                continue
+            digits = _TRAILING_DIGITS_RE.search(data[start:end].decode('utf-8', errors='ignore'))
+            if digits:
+                figure_counts[int(digits.group())] += 1
+
+        # Keep only non-overlapping headings, as re.finditer would; the last one wins
+        heading = None
+        last_end = -1
+        for start in sorted(headings):
+            if start >= last_end:
+                heading = (start, headings[start])
+                last_end = heading[1]
+
+        if heading:
+            start, end = heading
+            body = data[:start].decode('utf-8', errors='ignore')
+            references = data[end:].decode('utf-8', errors='ignore')
+        else:
+            body, references = text, ''
+
+        return {
+            'citations': citations,
+            'figure_counts': figure_counts,
+            'body': body,
+            'references': references,
+        }
+
+    @staticmethod
+    def check_reference_citation_indexed(index: Set[int], reference_order: int,
+                                         authors: str = None, text: str = None,
+                                         author_counts: Dict[str, int] = None,
+                                         body_text: str = None) -> Dict[str, Any]:
+        """
+        Same as check_reference_citation, but uses a prebuilt citation index.
+        
+        Args:
+            index: Result of build_citation_index for the document text.
+            reference_order: The reference number (e.g., 1 for [1]).
+            authors: The author string (e.g., "Smith et al.").
+            text: The full text content, used for the author-name fallback.
+            author_counts: Optional result of build_author_counts, computed over
+                body_text when that is given.
+            body_text: Optional text with the reference section stripped.
             
-            name_parts = re.split(r'[\s,]+', first_author_group)
-            potential_names = [p for p in name_parts if len(p) > 2 and p.istitle()]
+        Returns:
+            Dict with 'valid' (bool) and 'reason' (str).
+        """
+        if reference_order in index:
+            return {'valid': True, 'reason': f"Found citation number {reference_order} in text"}
+
+        if not text:
+            return {'valid': False, 'reason': "No text content available"}
+
+        return ContentChecker._check_author_citation(text, authors, author_counts, body_text)
+
+    @staticmethod
+    def _split_body_refs(text: str) -> Tuple[str, str]:
+        """
+        Splits text at the last "References"/"Bibliography" heading line.
+        
+        Returns:
+            (body, references). references is empty when no heading is found.
+        """
+        if not text:
+            return '', ''
+
+        heading = None
+        for heading in _REF_HEADING_RE.finditer(text):
+            pass
+
+        if heading is None:
+            return text, ''
+        return text[:heading.start()], text[heading.end():]
+
+    @staticmethod
+    def _candidate_author_names(authors: str) -> List[str]:
+        """Extracts the first author's likely last-name tokens from an author string."""
+        if not authors:
+            return []
+
+        # Extract the first author's last name
+        # Typical formats: "Smith et al.", "Smith, J.", "John Smith"
+        # We'll try to find the first significant name part
+        
+        # Remove "et al."
+        clean_authors = _ET_AL_RE.sub('', authors)
+        
+        # Split by comma to get first author group if multiple
+        first_author_group = clean_authors.split(',')[0].strip()
+        
+        # Try to find a last name (usually the word before a comma or the last word)
+        # If "Smith, J.", split by comma -> "Smith"
+        # If "John Smith", split by space -> "Smith"
+        
+        name_parts = re.split(r'[\s,]+', first_author_group)
+        return [p for p in name_parts if len(p) > 2 and p.istitle()]
+
+    @staticmethod
+    def build_author_counts(text: str, author_strings: List[str]) -> Dict[str, int]:
+        """
+        Counts whole-word occurrences of every candidate author name in one pass.
+        
+        Uses an Aho-Corasick automaton when pyahocorasick is installed, otherwise
+        a single combined regex alternation; both count overlapping names.
+        
+        Args:
+            text: The full text content of the PDF.
+            author_strings: Author strings of all references in the document.
             
-            for name in potential_names:
-                # Search for the name in text, but avoid matching the reference list itself if possible.
-                # (Ideally we'd exclude the reference section, but for now we search the whole text)
-                # We look for "Name et al" or "Name (Year)" or just "Name" in a sentence.
-                
-                # Simple check: is the name in the text more than once? 
-                # (Assuming once is the reference list entry itself)
-                matches = re.findall(r'\b' + re.escape(name) + r'\b', text)
-                if len(matches) >= 2:
-                     return {'valid': True, 'reason': f"Found author name '{name}' in text"}
+        Returns:
+            Dict mapping candidate name -> number of whole-word matches.
+        """
+        names = set()
+        for authors in author_strings:
+            names.update(ContentChecker._candidate_author_names(authors))
+
+        counts = dict.fromkeys(names, 0)
+        if not text or not names:
+            return counts
+
+        if AHOCORASICK_AVAILABLE:
+            automaton = ahocorasick.Automaton()
+            for name in names:
+                automaton.add_word(name, name)
+            automaton.make_automaton()
+
+            text_len = len(text)
+            for end_idx, name in automaton.iter(text):
+                start_idx = end_idx - len(name) + 1
+                # Enforce the same word boundaries as the regex path
+                if start_idx > 0 and _is_word_char(text[start_idx - 1]):
+                    continue
+                if end_idx + 1 < text_len and _is_word_char(text[end_idx + 1]):
+                    continue
+                counts[name] += 1
+        else:
+            # Longest first so alternation never stops at a shorter prefix; the
+            # lookahead tries every position, so overlapping names are all seen
+            ordered = sorted(names, key=len, reverse=True)
+            alternation = '|'.join(re.escape(n) for n in ordered)
+            # A shorter name matching at the same position is a prefix of the longest one
+            shorter_prefixes = {
+                name: [other for other in ordered if len(other) < len(name) and name.startswith(other)]
+                for name in ordered
+            }
+
+            text_len = len(text)
+            for match in re.finditer(r'(?=\b(' + alternation + r')\b)', text):
+                name = match.group(1)
+                counts[name] += 1
+                start_idx = match.start()
+                for other in shorter_prefixes[name]:
+                    end_idx = start_idx + len(other)
+                    if end_idx == text_len or not _is_word_char(text[end_idx]):
+                        counts[other] += 1
+
+        return counts
+
+    @staticmethod
+    def _check_author_citation(text: str, authors: str = None,
+                               author_counts: Dict[str, int] = None,
+                               body_text: str = None) -> Dict[str, Any]:
+        """Fallback check: is the first author's last name mentioned in the text?"""
+        if body_text is not None:
+            # Reference list already stripped - a single mention is a citation
+            search_text, min_count = body_text, 1
+        else:
+            # Full text - assume one mention is the reference list entry itself
+            search_text, min_count = text, 2
+
+        for name in ContentChecker._candidate_author_names(authors):
+            # We look for "Name et al" or "Name (Year)" or just "Name" in a sentence.
+            if author_counts is not None and name in author_counts:
+                found = author_counts[name] >= min_count
+            elif name.isalpha():
+                # Plain alphabetic names need no regex - substring search + boundary checks
+                found = _count_whole_word(search_text, name, min_count) >= min_count
+            else:
+                # Stop scanning as soon as min_count matches are seen
+                matches = _name_re(name).finditer(search_text)
+                found = all(next(matches, None) is not None for _ in range(min_count))
+            if found:
+                return {'valid': True, 'reason': f"Found author name '{name}' in text"}
             
         return {'valid': False, 'reason': "Citation number or author name not found in text"}
 
@@ -98,35 +488,40 @@ class ContentChecker:
         if not text:
             return {'figures': {}, 'summary': "No text content"}
             
+        # Too short to hold even the shortest callout ("fig1") - skip the scan
+        if len(text) < _MIN_FIG_CALLOUT_LEN:
+            return {'counts': {}, 'validation': {}}
+            
         # Patterns for figure callouts
         # Fig. 1, Figure 1, Fig 1, figure 1
         # We want to capture the number.
         
-        pattern = re.compile(r'\b(?:fig\.?|figure)\s*(\d+)', re.IGNORECASE)
-        matches = pattern.findall(text)
-        
-        figure_counts = {}
-        for num in matches:
-            num_int = int(num)
-            figure_counts[num_int] = figure_counts.get(num_int, 0) + 1
-            
+        figure_counts = Counter(int(m.group(1)) for m in _FIG_RE.finditer(text))
+        return ContentChecker.summarize_figure_counts(figure_counts)
+
+    @staticmethod
+    def summarize_figure_counts(figure_counts: Dict[int, int]) -> Dict[str, Any]:
+        """
+        Builds the check_figure_callouts result from figure-number counts
+        (e.g. the 'figure_counts' of scan_document).
+        """
         # Validate: "if the figure number is available at inside the text content at least 2 time"
         # We'll return the raw counts and let the caller/UI decide how to present it,
         # or we can return a list of valid/invalid figures.
         
-        validation_results = {}
-        for fig_num, count in figure_counts.items():
-            # We assume one mention might be the caption itself, so we need at least 2 mentions 
-            # to count as "cited in text" + "caption".
-            # The requirement says "available at inside the text content at least 2 time".
-            is_valid = count >= 2
-            validation_results[fig_num] = {
+        # We assume one mention might be the caption itself, so we need at least 2 mentions 
+        # to count as "cited in text" + "caption".
+        # The requirement says "available at inside the text content at least 2 time".
+        validation_results = {
+            fig_num: {
                 'count': count,
-                'valid': is_valid,
-                'reason': f"Found {count} times" if is_valid else f"Found only {count} time(s)"
+                'valid': count >= 2,
+                'reason': f"Found {count} times" if count >= 2 else f"Found only {count} time(s)"
             }
+            for fig_num, count in figure_counts.items()
+        }
             
         return {
-            'counts': figure_counts,
+            'counts': dict(figure_counts),
             'validation': validation_results
         }
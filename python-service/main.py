@@ -5,27 +5,47 @@ Handles PDF text extraction, reference extraction, and figure/diagram extraction
 
 from fastapi import FastAPI, HTTPException, UploadFile, File, Header
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-from typing import Optional
+from fastapi.responses import JSONResponse, ORJSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import List, Optional, Tuple, Dict, Any
+from typing import List, Optional, Tuple, Dict, Any, Iterator
+from typing_extensions import TypedDict  # pydantic rejects typing.TypedDict before Python 3.12
 import fitz  # PyMuPDF
-import io
 import os
-import tempfile
 from pathlib import Path
-import imagehash
-from PIL import Image
 import json
 import re
-from pdfminer.high_level import extract_text as pdfminer_extract
-from pdfminer.layout import LTTextContainer, LTFigure
-import pdfplumber
 import logging
 import time
+import dataclasses
+import asyncio
+import hashlib
+from functools import lru_cache
+import sqlite3
+import threading
+import multiprocessing
+from collections import OrderedDict
+from itertools import islice
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 import google.generativeai as genai
 from dotenv import load_dotenv
 
+# Optional faster JSON codec for Gemini replies, the result cache and API responses
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except ImportError:
+    ORJSON_AVAILABLE = False
+
+if ORJSON_AVAILABLE:
+    _json_loads = orjson.loads
+
+    def _json_dumps(obj: Any) -> str:
+        return orjson.dumps(obj).decode()
+else:
+    _json_loads = json.loads
+    _json_dumps = json.dumps
+
 # Configure logging first
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -67,7 +87,11 @@ if GEMINI_API_KEY:
 else:
     logger.warning("GEMINI_API_KEY not found in environment variables")
 
-app = FastAPI(title="Scholar Sentinel PDF Service", version="1.0.0")
+app = FastAPI(
+    title="Scholar Sentinel PDF Service",
+    version="1.0.0",
+    default_response_class=ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+)
 
 # CORS middleware
 app.add_middleware(
@@ -101,6 +125,13 @@ class ReferenceExtractionResponse(BaseModel):
     references: List[Reference]
     count: int
 
+class DocumentExtractionResponse(BaseModel):
+    text: str
+    pages: int
+    metadata: Dict[str, Any]
+    references: List[Reference]
+    count: int
+
 class Figure(BaseModel):
     order: int
     page_number: int
@@ -114,93 +145,162 @@ class FigureExtractionResponse(BaseModel):
     figures: List[Figure]
     count: int
 
+# Precompiled patterns shared by the reference parsing helpers below
+# Venue patterns in priority order, with a literal each one needs in order to match
+_VENUE_LITERALS = (('conference', 'proc.'), ('journal', 'vol.'), ('after_in', None))
+_WHITESPACE_RE = re.compile(r'\s+')
+# Quote characters preprocess_text treats as title delimiters
+_QUOTE_CHARS = frozenset('"\'')
+# A quoted run (opening quote, body, closing quote if present) or an unquoted run
+_QUOTE_SEGMENT_RE = re.compile(r'(["\'][^"\']*["\']?)|[^"\']+')
+_REF_NUMBER_PREFIX_RE = re.compile(r'^\[\d+\]\s*')
+_PHRASE_RE = re.compile(r'[^.,;]+')
+_DIGITS_ONLY_RE = re.compile(r'^\d+$')
+_INITIAL_SURNAME_RE = re.compile(r'^[A-Z]\.\s+[A-Z][a-z]+')
+# "A. Smith et al., " then "B. Jones, C. Doe, " - both optional, applied in that
+# order in one pass (same result as stripping them with two successive subs)
+_LEADING_AUTHORS_RE = re.compile(
+    r'^(?:[A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?,\s*)?'
+    r'(?:[A-Z]\.\s+[A-Z][a-z]+(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*,\s*)?'
+)
+_AUTHOR_ONLY_TITLE_RE = re.compile(r'^[A-Z]\.\s+[A-Z][a-z]+(\s+et\s+al\.)?$')
+_NUMERIC_TITLE_RE = re.compile(r'^[\d\s.,;:]+$')
+_ASCII_LETTERS = frozenset('abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ')
+_LEADING_NAME_RE = re.compile(r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)')
+
+# Multiple-papers-in-one-reference detection
+_QUOTED_TITLE_RE = re.compile(r'["""'']([^"""'']{10,200})["""'']')
+_VOL_RE = re.compile(r'\bvol\.', re.IGNORECASE)
+_YEAR_TOKEN_RE = re.compile(r'\b(19|20)\d{2}\b')
+# Pattern: "Title", Journal/Conference, vol. X, pp. Y, Year.
+# Match quotes: single quote, double quote, or triple quotes
+# Use triple-quoted raw string to avoid escape sequence warnings
+# Negated classes are greedy, not lazy: each run stops at its delimiter, so the
+# match is the same without stepping the quantifier one character at a time
+_PAPER_RE = re.compile(
+    r'''["']([^"']{10,200})["']\s*,\s*([^,]{5,100}),\s*(?:vol\.\s*\d+[^.]*\.|pp\.\s*[^.]*\.|(?:19|20)\d{2}\.)''',
+    re.DOTALL | re.IGNORECASE
+)
+_AUTHOR_PREFIX_RE = re.compile(r'^([A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*)')
+
+# Reference list splitting
+# Pattern 1: Numbered references [1], [2], etc. - a marker followed by whitespace
+# starts a reference, which runs until the next marker or the end of the text
+_REF_MARKER_RE = re.compile(r'\[(\d+)\](\s*)')
+# A line holding only a references heading
+_REF_HEADING_LINE_RE = re.compile(r'^[ \t]*(?:References?|Bibliography|Works\s+Cited)[ \t]*$', re.IGNORECASE | re.MULTILINE)
+# Pattern 2: Author (Year) format
+# Page checks used to pick the references page(s) sent to Gemini
+_REF_PAGE_HEADER_RE = re.compile(r'References?|Bibliography|Works\s+Cited', re.IGNORECASE)
+_REF_PAGE_CONTINUES_RE = re.compile(r'\[\d+\]|^\d+\.\s+[A-Z]', re.MULTILINE)
+_REF_PAGE_LIKE_RE = re.compile(r'\[\d+\]|^\d+\.\s+[A-Z]|et al\.', re.MULTILINE)
+# Everything after a references heading, tried in this order
+# Start of a numbered reference entry: [12] or 12. Author
+_REF_ENTRY_START_RE = re.compile(r'(?=^\s*\[\d+\]|^\s*\d+\.\s+[A-Z])', re.MULTILINE)
+# Fallback split points for sections without numbered entries: after blank lines, then lines
+_REF_PIECE_SPLIT_RES = (re.compile(r'(?<=\n\n)'), re.compile(r'(?<=\n)'))
+_REF_SECTION_RES = [
+    re.compile(r'References?\s*\n(.+)', re.IGNORECASE | re.DOTALL),
+    re.compile(r'Bibliography\s*\n(.+)', re.IGNORECASE | re.DOTALL),
+    re.compile(r'Works\s+Cited\s*\n(.+)', re.IGNORECASE | re.DOTALL),
+]
+_AUTHOR_YEAR_REF_RE = re.compile(
+    r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\((\d{4})\)\s*(.+?)(?=[A-Z][a-z]+\s*\(\d{4}\)|$)',
+    re.DOTALL | re.MULTILINE
+)
+
+# First-page metadata heuristics
+# Skip header/footer lines
+# Titles and author blocks sit in the page header; no need to walk the whole text
+_HEADER_SCAN_LINES = 60
+_TITLE_SKIP_RE = re.compile(
+    r'XXX|©|IEEE|ACM|Springer'
+    r'|^\d+\s*$'  # Page numbers
+    r'|^Abstract|^Keywords|^Introduction'
+    r'|@.*\.(?:edu|com|org)'  # Email addresses
+    r'|http[s]?://',  # URLs
+    re.IGNORECASE
+)
+_AUTHOR_NAME_LINE_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?$')
+_FIRST_MIDDLE_LAST_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z]\.\s+[A-Z][a-z]+$')
+_DATE_LIKE_RE = re.compile(r'\d{4}|\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}')
+_NAME_START_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z]')
+_CONTACT_RE = re.compile(r'@|http|doi', re.IGNORECASE)
+_PAGE_TITLE_TRAILING_PUNCT_RE = re.compile(r'[.,;:]+\s*$')
+_AUTHOR_LINE_RE = re.compile(r'^[A-Z][a-z]+\s+[A-Z][\w]*$')
+_MONTH_DATE_YEAR_RE = re.compile(r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},\s+(20\d{2})\b')
+_YEAR_20XX_RE = re.compile(r'\b(20\d{2})\b')
+
+def _has_ascii_letters(text: str, count: int) -> bool:
+    """True if text contains at least count ASCII letters, stopping as soon as it does"""
+    for char in text:
+        if char in _ASCII_LETTERS:
+            count -= 1
+            if count == 0:
+                return True
+    return False
+
 class ReferenceParser:
     """Enhanced reference parser with better multi-line support"""
     
-    # Comprehensive regex patterns
-    PATTERNS = {
+    # Comprehensive regex patterns, compiled once with their flags baked in
+    COMPILED = {
         'title': {
             # Multi-line title in quotes (CRITICAL for your use case)
-            'quoted_multiline': r'["""''](.{10,500}?)["""'']',
+            # Ten characters, then the run up to the next quote taken atomically
+            # (lookahead + backreference), so unbalanced quotes cannot backtrack
+            'quoted_multiline': re.compile(r'"(.{10}(?=([^"]{0,490}))\2)"', re.DOTALL),
             # Single line quoted
-            'quoted_single': r'["""'']([^"""''\n]{10,250})["""'']',
+            'quoted_single': re.compile(r'["""'']([^"""''\n]{10,250})["""'']'),
             # Title before year (capture everything between comma and year)
-            'before_year': r',\s*([A-Z][^,]{15,250}?)\s*,?\s*(?:in|In|Proc\.|pp\.|vol\.|\d{4})',
+            'before_year': re.compile(r',\s*([A-Z][^,]{15,250}?)\s*,?\s*(?:in|In|Proc\.|pp\.|vol\.|\d{4})', re.IGNORECASE),
             # Title after authors (full capture)
-            'after_comma': r'(?:et\s+al\.|[A-Z][a-z]+)\s*,\s*([A-Z][^,]{15,250}?)\s*,',
+            'after_comma': re.compile(r'(?:et\s+al\.|[A-Z][a-z]+)\s*,\s*([A-Z][^,]{15,250}?)\s*,', re.IGNORECASE),
         },
         'authors': {
             # Standard: "V. Banupriya et al."
-            'initials': r'^(?:\[\d+\]\s*)?([A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?)',
+            'initials': re.compile(r'^(?:\[\d+\]\s*)?([A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?)'),
             # Multiple authors: "V. Banupriya, S. Smith, et al."
-            'multiple': r'^(?:\[\d+\]\s*)?([A-Z]\.\s+[A-Z][a-z]+(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*(?:\s+et\s+al\.)?)',
+            'multiple': re.compile(r'^(?:\[\d+\]\s*)?([A-Z]\.\s+[A-Z][a-z]+(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*(?:\s+et\s+al\.)?)'),
             # Full names: "John Smith, Jane Doe"
-            'full_names': r'^(?:\[\d+\]\s*)?([A-Z][a-z]+\s+[A-Z][a-z]+(?:(?:\s*,\s*|\s+and\s+)[A-Z][a-z]+\s+[A-Z][a-z]+)*)',
+            'full_names': re.compile(r'^(?:\[\d+\]\s*)?([A-Z][a-z]+\s+[A-Z][a-z]+(?:(?:\s*,\s*|\s+and\s+)[A-Z][a-z]+\s+[A-Z][a-z]+)*)'),
             # Last, First: "Smith, J."
-            'last_first': r'^(?:\[\d+\]\s*)?([A-Z][a-z]+,\s*[A-Z]\.(?:\s*,\s*[A-Z][a-z]+,\s*[A-Z]\.)*)',
+            'last_first': re.compile(r'^(?:\[\d+\]\s*)?([A-Z][a-z]+,\s*[A-Z]\.(?:\s*,\s*[A-Z][a-z]+,\s*[A-Z]\.)*)'),
         },
         'year': {
-            'in_parens': r'\((\d{4})\)',
-            'after_comma': r',\s*(\d{4})\b',
-            'anywhere': r'\b((?:19|20)\d{2})\b',
+            'in_parens': re.compile(r'\((\d{4})\)'),
+            'after_comma': re.compile(r',\s*(\d{4})\b'),
+            'anywhere': re.compile(r'\b((?:19|20)\d{2})\b'),
         },
         'doi': {
-            'with_prefix': r'doi:\s*(10\.\d{4,}/[^\s,)"]+)',
-            'url': r'doi\.org/(10\.\d{4,}/[^\s,)"]+)',
-            'standard': r'\b(10\.\d{4,}/[^\s,)"]+)',
+            'with_prefix': re.compile(r'doi:\s*(10\.\d{4,}/[^\s,)"]+)', re.IGNORECASE),
+            'url': re.compile(r'doi\.org/(10\.\d{4,}/[^\s,)"]+)', re.IGNORECASE),
+            'standard': re.compile(r'\b(10\.\d{4,}/[^\s,)"]+)', re.IGNORECASE),
         },
         'venue': {
-            'conference': r'(?:in|In)\s+Proc\.\s+([^,]{10,150}?)(?:,|\(|\.)',
-            'journal': r',\s*([A-Z][^,]{5,100}?),\s*vol\.',
-            'after_in': r'\bin\s+([A-Z][^,]{10,100}?)(?:,|\.|\()',
+            'conference': re.compile(r'(?:in|In)\s+Proc\.\s+([^,]{10,150}?)(?:,|\(|\.)', re.IGNORECASE),
+            'journal': re.compile(r',\s*([A-Z][^,]{5,100}?),\s*vol\.', re.IGNORECASE),
+            'after_in': re.compile(r'\bin\s+([A-Z][^,]{10,100}?)(?:,|\.|\()', re.IGNORECASE),
         }
     }
     
     @staticmethod
     def preprocess_text(text: str, preserve_quotes: bool = False) -> str:
         """Preprocess reference text for better matching"""
-        if preserve_quotes:
-            # Preserve text within quotes but normalize outside
-            parts = []
-            in_quote = False
-            current = []
-            
-            for char in text:
-                if char in '"\'""''':
-                    if in_quote:
-                        # End quote - keep content as-is but replace newlines with spaces
-                        parts.append(''.join(current))
-                        current = []
-                        in_quote = False
-                    else:
-                        # Start quote - normalize accumulated text
-                        if current:
-                            normalized = re.sub(r'\s+', ' ', ''.join(current))
-                            parts.append(normalized)
-                        current = []
-                        in_quote = True
-                    parts.append(char)
-                elif in_quote:
-                    # Inside quotes - keep as-is but replace newlines with spaces
-                    if char == '\n':
-                        current.append(' ')
-                    else:
-                        current.append(char)
-                else:
-                    current.append(char)
-            
-            # Handle remaining text
-            if current:
-                if in_quote:
-                    parts.append(''.join(current))
-                else:
-                    normalized = re.sub(r'\s+', ' ', ''.join(current))
-                    parts.append(normalized)
-            
-            return ''.join(parts)
+        if preserve_quotes and not _QUOTE_CHARS.isdisjoint(text):
+            # Preserve text within quotes but normalize outside; newlines inside
+            # quotes become spaces and an unterminated quote runs to the end
+            # One output piece per run; quote characters are never newlines, so
+            # the whole quoted run is rewritten in place without re-joining its parts
+            return ''.join([
+                match.group(1).replace('\n', ' ') if match.group(1)
+                else _WHITESPACE_RE.sub(' ', match.group())
+                for match in _QUOTE_SEGMENT_RE.finditer(text)
+            ])
         else:
             # Simple normalization - replace all whitespace with single space
-            return re.sub(r'\s+', ' ', text)
+            # (also exact for quote-free text, where there is nothing to preserve)
+            return _WHITESPACE_RE.sub(' ', text)
     
     @classmethod
     def extract_title(cls, text: str) -> Tuple[Optional[str], str]:
@@ -215,7 +315,7 @@ class ReferenceParser:
         logger.debug(f"Preprocessed: {preprocessed[:100]}...")
         
         # Method 1: Title in quotes (HIGHEST CONFIDENCE)
-        match = re.search(cls.PATTERNS['title']['quoted_multiline'], preprocessed, re.DOTALL)
+        match = cls.COMPILED['title']['quoted_multiline'].search(preprocessed)
         if match:
             title = match.group(1).strip()
             title = cls._clean_title(title)
@@ -224,7 +324,7 @@ class ReferenceParser:
                 return title, 'high'
         
         # Method 2: Title before year
-        match = re.search(cls.PATTERNS['title']['before_year'], preprocessed, re.IGNORECASE)
+        match = cls.COMPILED['title']['before_year'].search(preprocessed)
         if match:
             title = match.group(1).strip()
             title = cls._clean_title(title)
@@ -233,7 +333,7 @@ class ReferenceParser:
                 return title, 'medium'
         
         # Method 3: Title after comma (after authors)
-        match = re.search(cls.PATTERNS['title']['after_comma'], preprocessed, re.IGNORECASE)
+        match = cls.COMPILED['title']['after_comma'].search(preprocessed)
         if match:
             title = match.group(1).strip()
             title = cls._clean_title(title)
@@ -242,20 +342,22 @@ class ReferenceParser:
                 return title, 'medium'
         
         # Method 4: Fallback - find longest meaningful phrase
-        phrases = re.split(r'[.,;]', preprocessed)
-        candidates = []
-        
-        for phrase in phrases:
-            phrase = phrase.strip()
-            if (len(phrase) > 20 and 
+        best_phrase = None
+        best_len = 20
+        end = len(preprocessed)
+        for match in _PHRASE_RE.finditer(preprocessed):
+            # Nothing in the rest of the text can beat the current best
+            if end - match.start() <= best_len:
+                break
+            phrase = match.group().strip()
+            if (len(phrase) > best_len and 
                 phrase[0].isupper() and 
-                not re.match(r'^\d+$', phrase) and
-                not re.match(r'^[A-Z]\.\s+[A-Z][a-z]+', phrase)):
-                candidates.append(phrase)
+                not _DIGITS_ONLY_RE.match(phrase) and
+                not _INITIAL_SURNAME_RE.match(phrase)):
+                best_phrase, best_len = phrase, len(phrase)
         
-        if candidates:
-            title = max(candidates, key=len)
-            title = cls._clean_title(title)
+        if best_phrase:
+            title = cls._clean_title(best_phrase)
             if cls._is_valid_title(title):
                 logger.info(f"✓ Extracted title (fallback, low confidence): {title[:80]}...")
                 return title, 'low'
@@ -270,26 +372,32 @@ class ReferenceParser:
             return title
         
         # Remove author names that might be included
-        title = re.sub(r'^([A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?),\s*', '', title)
-        title = re.sub(r'^([A-Z]\.\s+[A-Z][a-z]+(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*),\s*', '', title)
-        title = re.sub(r'\s+', ' ', title)
-        title = re.sub(r'[,;:]+\s*$', '', title)
+        title = _LEADING_AUTHORS_RE.sub('', title, count=1)
+        title = _WHITESPACE_RE.sub(' ', title)
+        
+        # Drop trailing ",;:" and the single space that may follow it; whitespace
+        # is already collapsed, so plain rstrip calls do what a regex would
+        stripped = title.rstrip(' ')
+        if stripped.endswith((',', ';', ':')):
+            title = stripped.rstrip(',;:')
         
         if len(title) > 300:
-            title = title[:300].rsplit(' ', 1)[0]
+            cut = title.rfind(' ', 0, 300)
+            title = title[:cut] if cut != -1 else title[:300]
         
         return title.strip()
     
     @staticmethod
     def _is_valid_title(title: str) -> bool:
         """Check if extracted title is valid"""
+        # Cheapest checks first; the letter count stops at the fifth letter
         if not title or len(title) < 10:
             return False
-        if re.match(r'^[A-Z]\.\s+[A-Z][a-z]+(\s+et\s+al\.)?$', title):
+        if not _has_ascii_letters(title, 5):
             return False
-        if re.match(r'^[\d\s.,;:]+$', title):
+        if _AUTHOR_ONLY_TITLE_RE.match(title):
             return False
-        if len(re.findall(r'[a-zA-Z]', title)) < 5:
+        if _NUMERIC_TITLE_RE.match(title):
             return False
         return True
     
@@ -299,23 +407,23 @@ class ReferenceParser:
         if not text:
             return None, 'low'
         
-        clean_text = re.sub(r'^\[\d+\]\s*', '', text)
+        clean_text = _REF_NUMBER_PREFIX_RE.sub('', text)
         
         patterns = [
-            (cls.PATTERNS['authors']['multiple'], 'high'),
-            (cls.PATTERNS['authors']['initials'], 'high'),
-            (cls.PATTERNS['authors']['full_names'], 'medium'),
-            (cls.PATTERNS['authors']['last_first'], 'medium'),
+            (cls.COMPILED['authors']['multiple'], 'high'),
+            (cls.COMPILED['authors']['initials'], 'high'),
+            (cls.COMPILED['authors']['full_names'], 'medium'),
+            (cls.COMPILED['authors']['last_first'], 'medium'),
         ]
         
         for pattern, confidence in patterns:
-            match = re.match(pattern, clean_text)
+            match = pattern.match(clean_text)
             if match:
                 authors = match.group(1).strip()
                 logger.debug(f"Extracted authors ({confidence}): {authors}")
                 return authors, confidence
         
-        match = re.match(r'^([A-Z][a-z]+(?:\s+[A-Z][a-z]+)?)', clean_text)
+        match = _LEADING_NAME_RE.match(clean_text)
         if match:
             return match.group(1).strip(), 'low'
         
@@ -328,13 +436,13 @@ class ReferenceParser:
             return None, 'low'
         
         patterns = [
-            (cls.PATTERNS['year']['in_parens'], 'high'),
-            (cls.PATTERNS['year']['after_comma'], 'medium'),
-            (cls.PATTERNS['year']['anywhere'], 'low'),
+            (cls.COMPILED['year']['in_parens'], 'high'),
+            (cls.COMPILED['year']['after_comma'], 'medium'),
+            (cls.COMPILED['year']['anywhere'], 'low'),
         ]
         
         for pattern, confidence in patterns:
-            match = re.search(pattern, text)
+            match = pattern.search(text)
             if match:
                 year = int(match.group(1))
                 if 1900 <= year <= 2030:
@@ -345,11 +453,12 @@ class ReferenceParser:
     @classmethod
     def extract_doi(cls, text: str) -> Optional[str]:
         """Extract DOI"""
-        if not text:
+        # Every DOI pattern needs a "10." prefix, so most references skip all three scans
+        if not text or '10.' not in text:
             return None
         
         for pattern in ['with_prefix', 'url', 'standard']:
-            match = re.search(cls.PATTERNS['doi'][pattern], text, re.IGNORECASE)
+            match = cls.COMPILED['doi'][pattern].search(text)
             if match:
                 return match.group(1)
         
@@ -361,19 +470,51 @@ class ReferenceParser:
         if not text:
             return None
         
-        for pattern_name in ['conference', 'journal', 'after_in']:
-            match = re.search(cls.PATTERNS['venue'][pattern_name], text, re.IGNORECASE)
+        # Skip patterns whose required literal is absent; letters in these
+        # literals have no special case folds, so lower() is exact here
+        lowered = text.lower()
+        for pattern_name, literal in _VENUE_LITERALS:
+            if literal and literal not in lowered:
+                continue
+            match = cls.COMPILED['venue'][pattern_name].search(text)
             if match:
                 venue = match.group(1).strip()
-                venue = re.sub(r'\s+', ' ', venue)
+                venue = _WHITESPACE_RE.sub(' ', venue)
                 return venue
         
         return None
 
-def parse_reference_text(text: str, order: int) -> Reference:
+# Set FORCE_GEMINI=1 to send every reference to Gemini, even when the local parser is confident
+FORCE_GEMINI = os.getenv("FORCE_GEMINI", "").lower() in ("1", "true", "yes")
+
+@lru_cache(maxsize=1024)
+def confident_local_extraction(text: str) -> Optional[Dict[str, Any]]:
+    """
+    Title, authors, and year from ReferenceParser when all three are high confidence, else None.
+    Cheapest extractor first so most references bail out early.
+    """
+    parser = ReferenceParser()
+    year, year_confidence = parser.extract_year(text)
+    if year_confidence != 'high':
+        return None
+    authors, authors_confidence = parser.extract_authors(text)
+    if authors_confidence != 'high':
+        return None
+    title, title_confidence = parser.extract_title(text)
+    if title_confidence != 'high':
+        return None
+    return {'title': title, 'authors': authors, 'year': year}
+
+def needs_gemini(text: str) -> bool:
+    """Whether a reference should go to Gemini rather than the local parser"""
+    return FORCE_GEMINI or confident_local_extraction(text) is None
+
+def parse_reference_text(text: str, order: int, ai_data: Optional[Dict[str, Any]] = None) -> Reference:
     """
     Parse a reference text string to extract structured information.
-    Uses ONLY Gemini AI for title, authors, and year extraction.
+    Uses Gemini AI for title, authors, and year extraction, unless the regex parser
+    is already high confidence on all three (see FORCE_GEMINI).
+    If ai_data is given (e.g. from a batch call) it is used instead of a new Gemini request.
     """
     # Extract DOI and venue using regex (these are structured and reliable)
     parser = ReferenceParser()
@@ -386,9 +527,16 @@ def parse_reference_text(text: str, order: int) -> Reference:
     year = None
     ai_extraction = None
     
-    if GEMINI_API_KEY:
+    if ai_data is None and not needs_gemini(text):
+        local_data = confident_local_extraction(text)
+        title = local_data['title']
+        authors = local_data['authors']
+        year = local_data['year']
+        logger.info(f"✓ Local parser extracted reference #{order} with high confidence, skipping Gemini")
+    elif GEMINI_API_KEY:
         try:
-            ai_data = extract_with_gemini(text)
+            if ai_data is None:
+                ai_data = extract_with_gemini(text)
             if ai_data:
                 ai_extraction = {
                     'title': ai_data.get('title'),
@@ -433,31 +581,33 @@ def split_multiple_papers_in_reference(ref_text: str, ref_num: int) -> List[str]
     # 2. Multiple "vol." patterns (indicates multiple journal entries)
     # 3. Pattern: author, "title1", journal1, year. "title2", journal2, year
     
+    # Two quoted titles need at least four quote characters; most references
+    # hold a single title, so they skip every scan below
+    if ref_text.count('"') + ref_text.count("'") < 4:
+        return []
+    
     # Count quoted titles
-    quoted_titles = re.findall(r'["""'']([^"""'']{10,200})["""'']', ref_text)
+    quoted_titles = _QUOTED_TITLE_RE.findall(ref_text)
+    if len(quoted_titles) < 2:
+        return []
     
     # Count "vol." patterns (journal indicators)
-    vol_patterns = len(re.findall(r'\bvol\.', ref_text, re.IGNORECASE))
+    vol_patterns = len(_VOL_RE.findall(ref_text))
     
     # Count years (4-digit years)
-    years = len(re.findall(r'\b(19|20)\d{2}\b', ref_text))
+    years = len(_YEAR_TOKEN_RE.findall(ref_text))
     
     # If we have 2+ quoted titles AND 2+ vol. patterns OR 2+ years, likely multiple papers
     if len(quoted_titles) >= 2 and (vol_patterns >= 2 or years >= 2):
         logger.debug(f"Reference [{ref_num}] appears to contain multiple papers: {len(quoted_titles)} titles, {vol_patterns} volumes, {years} years")
         
         # Try to split by pattern: quoted title followed by journal/venue info ending with year and period
-        # Pattern: "Title", Journal/Conference, vol. X, pp. Y, Year.
-        # Match quotes: single quote, double quote, or triple quotes
-        # Use triple-quoted raw string to avoid escape sequence warnings
-        paper_pattern = r'''[""'\']([^""'\']{10,200})[""'\']\s*,\s*([^,]{5,100}?),\s*(?:vol\.\s*\d+[^.]*?\.|pp\.\s*[^.]*?\.|(?:19|20)\d{2}\.)'''
-        
         papers = []
-        matches = list(re.finditer(paper_pattern, ref_text, re.DOTALL | re.IGNORECASE))
+        matches = list(_PAPER_RE.finditer(ref_text))
         
         if len(matches) >= 2:
             # Extract author from beginning of reference
-            author_match = re.match(r'^([A-Z]\.\s+[A-Z][a-z]+(?:\s+et\s+al\.)?(?:\s*,\s*[A-Z]\.\s+[A-Z][a-z]+)*)', ref_text)
+            author_match = _AUTHOR_PREFIX_RE.match(ref_text)
             author_prefix = author_match.group(1) if author_match else ""
             
             # Split into individual papers
@@ -483,29 +633,39 @@ def split_multiple_papers_in_reference(ref_text: str, ref_num: int) -> List[str]
     
     return []  # Not multiple papers, return empty list
 
+def split_numbered_references(text: str) -> List[Tuple[int, str]]:
+    """
+    Split a reference list into (number, text) pairs in one linear pass over the [N] markers.
+    If the text contains a references heading line, only the part after the last one is used.
+    """
+    headings = list(_REF_HEADING_LINE_RE.finditer(text))
+    if headings and _REF_MARKER_RE.search(text, headings[-1].end()):
+        text = text[headings[-1].end():]
+    
+    markers = list(_REF_MARKER_RE.finditer(text))
+    numbered = []
+    for i, marker in enumerate(markers):
+        if not marker.group(2):
+            continue  # "[3]x" ends the previous reference but does not start one
+        end = markers[i + 1].start() if i + 1 < len(markers) else len(text)
+        if end > marker.end():
+            numbered.append((int(marker.group(1)), text[marker.end():end]))
+    return numbered
+
 def extract_references_from_text(text: str) -> List[Reference]:
     """
     Extract references from PDF text using pattern matching.
     Handles cases where multiple papers by the same author are in one section.
     """
     references = []
+    pending = []  # (paper_text, order) pairs awaiting AI extraction
     
-    # Common reference patterns
-    # Pattern 1: Numbered references [1], [2], etc. - improved to capture all
-    # Match the number and the content until next number or end
-    numbered_pattern = r'\[(\d+)\]\s+(.+?)(?=\[\d+\]|$)'
-    
-    # Pattern 2: Author (Year) format
-    author_year_pattern = r'([A-Z][a-z]+(?:\s+[A-Z][a-z]+)*)\s*\((\d{4})\)\s*(.+?)(?=[A-Z][a-z]+\s*\(\d{4}\)|$)'
-    
-    # Try numbered references first
-    # Use DOTALL flag to match across newlines and capture full reference text
-    matches = list(re.finditer(numbered_pattern, text, re.DOTALL | re.MULTILINE))
-    logger.info(f"Found {len(matches)} potential numbered references in text")
+    # Try numbered references first, keeping the full multi-line text of each
+    numbered = split_numbered_references(text)
+    logger.info(f"Found {len(numbered)} potential numbered references in text")
     
-    for match in matches:
-        ref_num = int(match.group(1))  # Get actual reference number [1], [2], etc.
-        ref_text = match.group(2).strip()
+    for ref_num, ref_text in numbered:  # Actual reference numbers [1], [2], etc.
+        ref_text = ref_text.strip()
         
         # Don't truncate - use full text (minimum length check)
         if len(ref_text) > 15:  # Reduced threshold to catch shorter references
@@ -520,22 +680,40 @@ def extract_references_from_text(text: str) -> List[Reference]:
                 for idx, paper_text in enumerate(multiple_papers):
                     # Use ref_num for first paper, then ref_num.1, ref_num.2, etc.
                     order = ref_num if idx == 0 else ref_num + (idx * 0.1)
-                    ref = parse_reference_text(paper_text, int(order) if order == int(order) else order)
-                    references.append(ref)
+                    pending.append((paper_text, int(order) if order == int(order) else order))
             else:
                 # Single paper reference
-                ref = parse_reference_text(ref_text, ref_num)  # Use actual number
-                references.append(ref)
+                pending.append((ref_text, ref_num))  # Use actual number
         else:
             logger.debug(f"Skipping reference [{ref_num}] - too short: {len(ref_text)} chars")
     
+    # One Gemini request per batch of references instead of one per reference;
+    # items the batch could not answer fall back to per-reference calls
+    # References the local parser is confident about never reach Gemini
+    ai_results = [None] * len(pending)
+    if GEMINI_API_KEY and pending:
+        ai_indices = [i for i, (paper_text, _) in enumerate(pending) if needs_gemini(paper_text)]
+        batch_results = extract_batch_with_gemini([pending[i][0] for i in ai_indices])
+        for i, result in zip(ai_indices, batch_results):
+            ai_results[i] = result
+    
+    # Per-reference fallbacks are network bound, so they run concurrently
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(GEMINI_MAX_CONCURRENCY, len(pending))) as executor:
+            references.extend(executor.map(
+                parse_reference_text,
+                [paper_text for paper_text, _ in pending],
+                [order for _, order in pending],
+                ai_results
+            ))
+    
     # Sort by order to ensure correct sequence
     references.sort(key=lambda x: x.order)
     logger.info(f"Extracted {len(references)} references from numbered pattern")
     
     # If no numbered references found, try author-year pattern
     if not references:
-        matches = re.finditer(author_year_pattern, text, re.DOTALL | re.MULTILINE)
+        matches = _AUTHOR_YEAR_REF_RE.finditer(text)
         for idx, match in enumerate(matches, 1):
             author = match.group(1)
             year = int(match.group(2))
@@ -554,31 +732,23 @@ def extract_references_from_text(text: str) -> List[Reference]:
 
 def extract_title(text: str) -> Optional[str]:
     """Extract title from first page - improved to capture full multi-line titles"""
-    lines = [line.strip() for line in text.split('\n') if line.strip()]
-    
-    # Skip header/footer lines
-    skip_patterns = [
-        r'XXX|©|IEEE|ACM|Springer',
-        r'^\d+\s*$',  # Page numbers
-        r'^Abstract|^Keywords|^Introduction',
-        r'@.*\.(edu|com|org)',  # Email addresses
-        r'http[s]?://',  # URLs
-    ]
+    stripped = (line.strip() for line in text.split('\n'))
+    lines = list(islice((line for line in stripped if line), _HEADER_SCAN_LINES))
     
     title_lines = []
     found_title_start = False
     
     for i, line in enumerate(lines):
         # Skip lines matching skip patterns
-        if any(re.search(pattern, line, re.IGNORECASE) for pattern in skip_patterns):
+        if _TITLE_SKIP_RE.search(line):
             continue
         
         # Look for potential title line (long enough, not author name pattern)
         is_potential_title = (
             len(line) > 15 and 
-            not re.match(r'^[A-Z][a-z]+\s+[A-Z][a-z]+(?:\s+[A-Z][a-z]+)?$', line) and  # Not just author name
-            not re.match(r'^[A-Z][a-z]+\s+[A-Z]\.\s+[A-Z][a-z]+$', line) and  # Not "First M. Last"
-            not re.search(r'\d{4}|\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2}', line)  # Not dates
+            not _AUTHOR_NAME_LINE_RE.match(line) and  # Not just author name
+            not _FIRST_MIDDLE_LAST_RE.match(line) and  # Not "First M. Last"
+            not _DATE_LIKE_RE.search(line)  # Not dates
         )
         
         if is_potential_title:
@@ -588,7 +758,7 @@ def extract_title(text: str) -> Optional[str]:
             else:
                 # Continue collecting title lines
                 # Stop if we hit author pattern, email, or affiliation
-                if (re.match(r'^[A-Z][a-z]+\s+[A-Z]', line) or 
+                if (_NAME_START_RE.match(line) or 
                     '@' in line or 
                     'University' in line or 
                     'College' in line or
@@ -598,10 +768,10 @@ def extract_title(text: str) -> Optional[str]:
         
         # If we've found title and hit a blank line or author pattern, stop
         elif found_title_start:
-            if not line or re.match(r'^[A-Z][a-z]+\s+[A-Z]', line):
+            if not line or _NAME_START_RE.match(line):
                 break
             # Continue if line looks like continuation of title
-            if len(line) > 10 and not re.search(r'@|http|doi', line, re.IGNORECASE):
+            if len(line) > 10 and not _CONTACT_RE.search(line):
                 title_lines.append(line)
             else:
                 break
@@ -609,9 +779,9 @@ def extract_title(text: str) -> Optional[str]:
     if title_lines:
         title = ' '.join(title_lines).strip()
         # Clean up title (remove extra spaces, fix punctuation)
-        title = re.sub(r'\s+', ' ', title)
+        title = _WHITESPACE_RE.sub(' ', title)
         # Remove trailing punctuation that might be from line breaks
-        title = re.sub(r'[.,;:]+\s*$', '', title)
+        title = _PAGE_TITLE_TRAILING_PUNCT_RE.sub('', title)
         # Limit to reasonable length (titles are usually < 300 chars)
         if len(title) > 300:
             title = title[:300].rsplit(' ', 1)[0]  # Cut at last word boundary
@@ -621,13 +791,15 @@ def extract_title(text: str) -> Optional[str]:
 
 def extract_authors(text: str) -> List[str]:
     """Extract author names"""
-    lines = text.split('\n')
+    lines = text.split('\n', _HEADER_SCAN_LINES)[:_HEADER_SCAN_LINES]
     authors = []
     
     for line in lines:
         # Match author pattern: FirstName LastName or FirstName MiddleInitial LastName
-        if re.match(r'^[A-Z][a-z]+\s+[A-Z][\w]*$', line.strip()):
+        if _AUTHOR_LINE_RE.match(line.strip()):
             authors.append(line.strip())
+            if len(authors) == 10:
+                break
         # Stop at institutional affiliations or emails
         if '@' in line or 'Engineering' in line:
             break
@@ -637,30 +809,228 @@ def extract_authors(text: str) -> List[str]:
 def extract_year(text: str) -> Optional[int]:
     """Extract publication year"""
     # Look for dates in format: Month DD, YYYY
-    date_match = re.search(r'\b(Jan|Feb|Mar|Apr|May|Jun|Jul|Aug|Sep|Oct|Nov|Dec)\s+\d{1,2},\s+(20\d{2})\b', text)
+    date_match = _MONTH_DATE_YEAR_RE.search(text)
     if date_match:
         return int(date_match.group(2))
     
     # Look for any 4-digit year
-    year_match = re.search(r'\b(20\d{2})\b', text)
+    year_match = _YEAR_20XX_RE.search(text)
     return int(year_match.group(1)) if year_match else None
 
-def extract_with_gemini(text: str, api_key: Optional[str] = None) -> Dict[str, Any]:
-    """Extract title, authors, and year from a reference text using ONLY Gemini AI"""
+GEMINI_MODELS = ('gemini-2.5-flash', 'gemini-2.0-flash')
+
+# References sent per batch request; keeps prompt and output within bounds
+GEMINI_BATCH_SIZE = 25
+GEMINI_BATCH_TOKENS_PER_REF = 256
+# Upper bound on Gemini requests in flight at once (API rate limits)
+GEMINI_MAX_CONCURRENCY = 8
+# Long references sections are split into chunks of about this size, extracted in parallel
+GEMINI_REFERENCES_CHUNK_CHARS = 8000
+# Input budget for one references request, prompt included; a section that cannot be
+# split on entry boundaries is split on blank lines / lines instead. Estimated locally
+# (no count_tokens round trip).
+GEMINI_REFERENCES_MAX_INPUT_TOKENS = int(os.getenv("GEMINI_REFERENCES_MAX_INPUT_TOKENS", "32768"))
+GEMINI_CHARS_PER_TOKEN = 4
+
+# Directory for the persistent result caches (Gemini results, figure hashes)
+GEMINI_CACHE_DIR = Path(os.getenv("GEMINI_CACHE_DIR", "cache"))
+# Seconds a cache connection waits on another process's write lock (figure workers share a file)
+CACHE_DB_TIMEOUT = 30.0
+
+class ResultCache:
+    """JSON results keyed by a hash of their input, in a SQLite table with an in-memory LRU"""
+    
+    def __init__(self, cache_dir: Path = GEMINI_CACHE_DIR, memory_size: int = 4096, filename: str = "gemini_cache.db",
+                 table: str = "gemini_results", label: str = "Gemini"):
+        self.db_path = Path(cache_dir) / filename
+        self.table = table
+        self.label = label
+        self.memory_size = memory_size
+        self._memory: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+        self._disk_failed = False
+    
+    @staticmethod
+    def key(text: str) -> str:
+        return hashlib.blake2b(text.strip().encode('utf-8'), digest_size=16).hexdigest()
+    
+    def _connection(self):
+        """
+        Open the database on first use. Returns None once the database has failed
+        to open; the cache then keeps working in memory only.
+        """
+        if self._conn is None and not self._disk_failed:
+            try:
+                self.db_path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.db_path), timeout=CACHE_DB_TIMEOUT, check_same_thread=False)
+                # WAL lets readers in other processes run alongside the single writer
+                conn.execute('PRAGMA journal_mode=WAL')
+                # Safe with WAL: a crash can lose the last commit but not corrupt the DB
+                conn.execute('PRAGMA synchronous=NORMAL')
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS {self.table} (key TEXT PRIMARY KEY, result TEXT NOT NULL)'
+                )
+                conn.commit()
+                self._conn = conn
+            except (sqlite3.Error, OSError) as e:
+                self._disk_failed = True
+                logger.warning(f"{self.label} cache at {self.db_path} unavailable, caching in memory only: {e}")
+        return self._conn
+    
+    def _remember(self, key: str, result: Dict[str, Any]):
+        self._memory[key] = result
+        self._memory.move_to_end(key)
+        if len(self._memory) > self.memory_size:
+            self._memory.popitem(last=False)
+    
+    def get(self, text: str) -> Optional[Dict[str, Any]]:
+        key = self.key(text)
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+            conn = self._connection()
+            if conn is None:
+                return None
+            try:
+                row = conn.execute(
+                    f'SELECT result FROM {self.table} WHERE key = ?', (key,)
+                ).fetchone()
+                if row is None:
+                    return None
+                result = _json_loads(row[0])
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"{self.label} cache read failed: {e}")
+                return None
+            except json.JSONDecodeError as e:
+                logger.warning(f"{self.label} cache entry is corrupt, ignoring it: {e}")
+                return None
+            self._remember(key, result)
+            return result
+    
+    def set(self, text: str, result: Dict[str, Any]):
+        key = self.key(text)
+        with self._lock:
+            self._remember(key, result)
+            conn = self._connection()
+            if conn is None:
+                return
+            try:
+                conn.execute(
+                    f'INSERT OR REPLACE INTO {self.table} (key, result) VALUES (?, ?)',
+                    (key, _json_dumps(result))
+                )
+                conn.commit()
+            except (sqlite3.Error, OSError) as e:
+                logger.warning(f"{self.label} cache write failed: {e}")
+
+gemini_cache = ResultCache()
+# Perceptual hashes of extracted figures, keyed by the SHA-1 of the image bytes
+figure_hash_cache = ResultCache(filename="figure_hashes.db", table="figure_hashes", label="Figure hash")
+
+# GenerativeModel instances are reused across calls; they bind to the client for
+# the key configured when they were built, so they are dropped on a key change
+_gemini_lock = threading.Lock()
+_gemini_models: Dict[str, Any] = {}
+_gemini_configured_key: Optional[str] = None
+
+def configure_gemini(api_key: str):
+    """Point genai at api_key, reconfiguring only when the key changes"""
+    global _gemini_configured_key
+    with _gemini_lock:
+        if api_key != _gemini_configured_key:
+            genai.configure(api_key=api_key)
+            _gemini_configured_key = api_key
+            _gemini_models.clear()
+
+def get_gemini_model(model_name: str):
+    """Shared GenerativeModel for model_name; generation config is passed per request"""
+    with _gemini_lock:
+        model = _gemini_models.get(model_name)
+        if model is None:
+            model = _gemini_models[model_name] = genai.GenerativeModel(model_name)
+        return model
+
+# JSON mode makes Gemini reply with bare JSON instead of a fenced block; it needs
+# google-generativeai >= 0.5, older SDKs reject the unknown config field
+_GEMINI_JSON_MODE = (
+    {'response_mime_type': 'application/json'}
+    if 'response_mime_type' in {f.name for f in dataclasses.fields(genai.types.GenerationConfig)}
+    else {}
+)
+
+class _GeminiReferenceItem(TypedDict):
+    title: str
+    authors: str
+    year: Optional[int]
+    conference: Optional[str]
+    journal: Optional[str]
+    type: str
+
+class _GeminiReferenceList(TypedDict):
+    references: List[_GeminiReferenceItem]
+
+# Structured output (google-generativeai >= 0.7) makes the decoder follow the schema,
+# so the prompt no longer has to spell out the JSON structure
+def _gemini_schema_supported() -> bool:
+    """Whether this SDK takes response_schema and can convert _GeminiReferenceList"""
+    if not _GEMINI_JSON_MODE or 'response_schema' not in {
+        f.name for f in dataclasses.fields(genai.types.GenerationConfig)
+    }:
+        return False
+    try:
+        # The SDK converts the schema only when a request is sent; a class it rejects
+        # would fail every references request, so the conversion is tried up front
+        from google.generativeai.types import generation_types
+        generation_types.to_generation_config_dict(
+            genai.types.GenerationConfig(**_GEMINI_JSON_MODE, response_schema=_GeminiReferenceList)
+        )
+    except Exception as e:
+        logger.warning(f"Gemini structured output disabled, response_schema was rejected: {e}")
+        return False
+    return True
+
+_GEMINI_SCHEMA_MODE = _gemini_schema_supported()
+
+def _generate_with_gemini(prompt: str, generation_config: Dict[str, Any]):
+    """Run a prompt on the fastest Gemini model, falling back to the next one"""
+    last_error = None
+    for model_name in GEMINI_MODELS:
+        try:
+            model = get_gemini_model(model_name)
+            start_time = time.time()
+            response = model.generate_content(prompt, generation_config=generation_config)
+            elapsed_time = time.time() - start_time
+            logger.info(f"✓ Successfully used Gemini model: {model_name} (took {elapsed_time:.2f}s)")
+            return response
+        except Exception as e:
+            logger.warning(f"Gemini model {model_name} failed: {str(e)[:100]}, trying fallback...")
+            last_error = e
+    
+    logger.error(f"All Gemini models failed. Last error: {last_error}")
+    return None
+
+def _parse_gemini_json(response_text: str) -> Any:
+    """Parse a Gemini JSON reply, removing markdown code blocks if present"""
+    body = response_text.strip().removeprefix("```json").removeprefix("```").removesuffix("```")
+    return _json_loads(body.strip())
+
+def extract_with_gemini(text: str, api_key: Optional[str] = None, use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Extract title, authors, and year from a reference text using ONLY Gemini AI.
+    With use_cache=False the cached result is ignored (and replaced by the new one).
+    """
     # Use provided API key or fall back to global GEMINI_API_KEY
     gemini_key = api_key or GEMINI_API_KEY
     if not gemini_key:
         logger.debug("GEMINI_API_KEY not available, skipping AI extraction")
         return {}
     
-    # Use fastest model only for maximum speed
-    # gemini-2.5-flash is the fastest model available
-    model_name = 'gemini-2.5-flash'
-    
-    model = None
-    model_name_used = None
-    response = None
-    last_error = None
+    cached = gemini_cache.get(text) if use_cache else None
+    if cached is not None:
+        logger.debug("Gemini AI result served from cache")
+        return cached
     
     # Create prompt for individual reference extraction
     # Optimize: Reduce text sample for faster processing (3000 chars is usually enough for a single reference)
@@ -672,6 +1042,7 @@ def extract_with_gemini(text: str, api_key: Optional[str] = None) -> Dict[str, A
         'top_p': 0.95,       # Faster sampling
         'top_k': 40,         # Limit candidate tokens for speed
         'max_output_tokens': 1024,  # Limit output for faster responses
+        **_GEMINI_JSON_MODE,
     }
     prompt = f"""Analyze the following research paper reference text and extract bibliographic information.
 
@@ -696,71 +1067,29 @@ Important:
     
     # Configure Gemini with the API key
     try:
-        genai.configure(api_key=gemini_key)
+        configure_gemini(gemini_key)
     except Exception as e:
         logger.warning(f"Failed to configure Gemini AI with provided key: {e}")
         return {}
     
-    # Use fastest model with speed-optimized config
-    try:
-        model = genai.GenerativeModel(
-            model_name,
-            generation_config=generation_config
-        )
-        logger.debug(f"Using high-speed Gemini model: {model_name}")
-        
-        # Generate content with timing for performance monitoring
-        start_time = time.time()
-        response = model.generate_content(prompt)
-        elapsed_time = time.time() - start_time
-        model_name_used = model_name
-        logger.info(f"✓ Successfully used Gemini model: {model_name} (took {elapsed_time:.2f}s)")
-    except Exception as e:
-        logger.warning(f"High-speed model {model_name} failed: {str(e)[:100]}, trying fallback...")
-        last_error = e
-        # Fallback to gemini-2.0-flash if 2.5-flash fails
-        try:
-            model_name = 'gemini-2.0-flash'
-            model = genai.GenerativeModel(
-                model_name,
-                generation_config=generation_config
-            )
-            start_time = time.time()
-            response = model.generate_content(prompt)
-            elapsed_time = time.time() - start_time
-            model_name_used = model_name
-            logger.info(f"✓ Using fallback model: {model_name} (took {elapsed_time:.2f}s)")
-        except Exception as e2:
-            logger.error(f"All Gemini models failed. Last error: {e2}")
-            return {}
-    
-    if model is None or response is None:
-        logger.error(f"Failed to generate content. Last error: {last_error}")
+    # Use fastest model with speed-optimized config, falling back if it fails
+    response = _generate_with_gemini(prompt, generation_config)
+    if response is None:
         return {}
     
     try:
-        # Response already generated during model selection above
-        response_text = response.text.strip()
-        
-        # Clean up response (remove markdown code blocks if present)
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        # Parse JSON response
-        gemini_data = json.loads(response_text)
+        response_text = response.text
+        gemini_data = _parse_gemini_json(response_text)
         
         logger.debug(f"Gemini AI extracted: title={gemini_data.get('title')}, authors={len(gemini_data.get('authors', []))} authors, year={gemini_data.get('year')}")
         
-        return {
+        result = {
             'title': gemini_data.get('title'),
             'authors': gemini_data.get('authors', []),
             'year': gemini_data.get('year')
         }
+        gemini_cache.set(text, result)
+        return result
     except json.JSONDecodeError as e:
         logger.warning(f"Failed to parse Gemini AI JSON response: {e}")
         logger.debug(f"Response was: {response_text[:200] if 'response_text' in locals() else 'N/A'}")
@@ -769,115 +1098,179 @@ Important:
         logger.warning(f"Error using Gemini AI for extraction: {str(e)}")
         return {}
 
-def extract_references_with_gemini(full_text: str, doc=None, api_key: Optional[str] = None) -> List[Reference]:
-    """
-    Extract all references from PDF using Gemini AI.
-    If doc is provided, extracts text only from the references page(s).
-    """
-    # Use provided API key or fall back to global GEMINI_API_KEY
-    gemini_key = api_key or GEMINI_API_KEY
-    if not gemini_key:
-        logger.warning("GEMINI_API_KEY not available, cannot use AI for reference extraction")
-        return []
+def _extract_gemini_batch(batch: List[str]) -> List[Optional[Dict[str, Any]]]:
+    """Run one batch request; entries the reply does not cover stay None"""
+    results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+    numbered = "\n\n".join(f"[{i}] {text[:3000]}" for i, text in enumerate(batch, 1))
+    generation_config = {
+        'temperature': 0.1,
+        'top_p': 0.95,
+        'top_k': 40,
+        'max_output_tokens': min(8192, GEMINI_BATCH_TOKENS_PER_REF * len(batch)),
+        **_GEMINI_JSON_MODE,
+    }
+    prompt = f"""Analyze the following {len(batch)} numbered research paper reference texts and extract bibliographic information for each one.
+
+References:
+{numbered}
+
+Return a valid JSON array with exactly one object per numbered reference, in the same order, with these exact keys: index (the reference number as integer), title, authors (as a list of strings), year (as integer).
+
+Required JSON structure:
+[
+    {{"index": 1, "title": "exact paper title", "authors": ["First Author Name", "Second Author Name"], "year": 2024}}
+]
+
+Important:
+- Extract the COMPLETE title, even if it spans multiple lines or contains special characters
+- Extract ALL author names as a list (handle "et al." appropriately)
+- Extract the publication year (not creation date or submission date)
+- Keep titles exactly as written
+- Return valid JSON only, no extra text, no markdown formatting"""
     
-    # Use fastest model only for maximum speed
-    # gemini-2.5-flash is the fastest model available
-    model_name = 'gemini-2.5-flash'
+    response = _generate_with_gemini(prompt, generation_config)
+    if response is None:
+        return results
     
-    model = None
-    response = None
-    last_error = None
+    try:
+        items = _parse_gemini_json(response.text)
+    except Exception as e:
+        logger.warning(f"Failed to parse Gemini AI batch response: {e}")
+        return results
+    if not isinstance(items, list):
+        logger.warning("Gemini AI batch response was not a JSON array")
+        return results
+    
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.get('index', position + 1)
+        if not isinstance(index, int) or not 1 <= index <= len(batch):
+            continue
+        results[index - 1] = {
+            'title': item.get('title'),
+            'authors': item.get('authors') or [],
+            'year': item.get('year'),
+        }
     
-    # Generation config optimized for speed
-    generation_config = {
-        'temperature': 0.1,  # Lower temperature for faster, more deterministic responses
-        'top_p': 0.95,       # Faster sampling
-        'top_k': 40,         # Limit candidate tokens for speed
-        'max_output_tokens': 8192,  # Higher limit for multiple references, but still bounded
-    }
+    answered = sum(1 for result in results if result is not None)
+    logger.info(f"✓ Gemini AI batch extracted {answered}/{len(batch)} references")
+    return results
+
+def extract_batch_with_gemini(texts: List[str], api_key: Optional[str] = None) -> List[Optional[Dict[str, Any]]]:
+    """
+    Extract title, authors, and year for many reference texts with one Gemini request per batch.
+    Returns one entry per input text, aligned by index; None marks entries the batch
+    could not answer so the caller can fall back to extract_with_gemini.
+    """
+    gemini_key = api_key or GEMINI_API_KEY
+    if not gemini_key or not texts:
+        return [None] * len(texts)
     
-    # If doc is provided, extract only the references page(s)
+    try:
+        configure_gemini(gemini_key)
+    except Exception as e:
+        logger.warning(f"Failed to configure Gemini AI with provided key: {e}")
+        return [None] * len(texts)
+    
+    # Only texts without a cached result are sent to Gemini
+    results = [gemini_cache.get(text) for text in texts]
+    missing = [i for i, result in enumerate(results) if result is None]
+    if not missing:
+        return results
+    logger.info(f"Gemini cache: {len(texts) - len(missing)} hits, {len(missing)} misses")
+    
+    batches = [missing[start:start + GEMINI_BATCH_SIZE] for start in range(0, len(missing), GEMINI_BATCH_SIZE)]
+    # Requests are I/O bound, so the batches run concurrently in threads
+    with ThreadPoolExecutor(max_workers=min(GEMINI_MAX_CONCURRENCY, len(batches))) as executor:
+        batch_results = executor.map(_extract_gemini_batch, [[texts[i] for i in batch] for batch in batches])
+        for batch, answers in zip(batches, batch_results):
+            for i, result in zip(batch, answers):
+                if result is not None:
+                    gemini_cache.set(texts[i], result)
+                results[i] = result
+    return results
+
+# flags=11: ligatures and whitespace kept as in the PDF, no synthesized spaces between
+# glyphs. Image blocks are not collected (TEXT_PRESERVE_IMAGES is not set).
+_REFERENCES_TEXT_FLAGS = fitz.TEXT_PRESERVE_LIGATURES | fitz.TEXT_PRESERVE_WHITESPACE | fitz.TEXT_INHIBIT_SPACES
+
+def _references_page_texts(doc) -> List[str]:
+    """Text of every page, as read for reference extraction"""
+    # These flags preserve layout and ensure full text extraction.
+    # Pages are read one after another: PyMuPDF holds the GIL while extracting
+    # and is not thread-safe, so a thread pool would only add overhead.
+    return [doc[page_num].get_text("text", flags=_REFERENCES_TEXT_FLAGS) for page_num in range(len(doc))]
+
+def _references_text_sample(full_text: str, page_texts: Optional[List[str]] = None) -> Optional[str]:
+    """
+    Text of the references section to send to Gemini (see _references_chunks for long sections).
+    If page_texts (see _references_page_texts) is provided, only the references page(s) are used.
+    """
+    # If pages are provided, extract only the references page(s)
     ref_section = ""
-    if doc is not None:
+    if page_texts is not None:
         logger.info("Extracting text only from references page(s)...")
-        page_count = len(doc)
-        references_pages_text = ""
+        page_count = len(page_texts)
+        references_pages = []  # joined once at the end
         references_start_page = None
         
-        # Find the page(s) that contain "References" or "Bibliography"
-        pages_processed = set()  # Track which pages we've already processed
-        
-        for page_num in range(page_count):
-            # Skip if we've already processed this page
-            if page_num in pages_processed:
-                continue
-                
-            page = doc[page_num]
-            page_text = page.get_text("text", flags=11)
+        # Find the page(s) that contain "References" or "Bibliography", in one forward sweep:
+        # pages added as continuations are skipped rather than checked again
+        page_num = 0
+        while page_num < page_count:
+            page_text = page_texts[page_num]
             
             # Check if this page contains references header
-            if re.search(r'References?|Bibliography|Works\s+Cited', page_text, re.IGNORECASE):
-                if references_start_page is None:
-                    references_start_page = page_num
-                    logger.info(f"Found references starting at page {page_num + 1}")
-                
-                # Add this page
-                references_pages_text += page_text
-                pages_processed.add(page_num)
-                logger.debug(f"Added page {page_num + 1} to references text ({len(page_text)} chars)")
+            if not _REF_PAGE_HEADER_RE.search(page_text):
+                page_num += 1
+                continue
+            
+            if references_start_page is None:
+                references_start_page = page_num
+                logger.info(f"Found references starting at page {page_num + 1}")
+            
+            # Add this page
+            references_pages.append(page_text)
+            logger.debug(f"Added page {page_num + 1} to references text ({len(page_text)} chars)")
+            next_page_num = page_num + 1
+            
+            # Check the next page to see if references continue
+            # Look for patterns like [1], [2] or numbered references at the start
+            if next_page_num < page_count and _REF_PAGE_CONTINUES_RE.search(page_texts[next_page_num], 0, 500):
+                references_pages.append(page_texts[next_page_num])
+                logger.info(f"References continue on page {next_page_num + 1}, added to extraction")
+                logger.debug(f"Added page {next_page_num + 1} to references text ({len(page_texts[next_page_num])} chars)")
+                next_page_num += 1
                 
-                # Check the next page to see if references continue
-                if page_num + 1 < page_count and (page_num + 1) not in pages_processed:
-                    next_page = doc[page_num + 1]
-                    next_page_text = next_page.get_text("text", flags=11)
-                    # Check if next page has reference-like content (numbered references, author names, etc.)
-                    # Look for patterns like [1], [2] or numbered references at the start
-                    if re.search(r'\[\d+\]|^\d+\.\s+[A-Z]', next_page_text[:500], re.MULTILINE):
-                        references_pages_text += next_page_text
-                        pages_processed.add(page_num + 1)
-                        logger.info(f"References continue on page {page_num + 2}, added to extraction")
-                        logger.debug(f"Added page {page_num + 2} to references text ({len(next_page_text)} chars)")
-                        
-                        # Continue checking subsequent pages (up to 2 more pages) to see if references continue
-                        for next_page_num in range(page_num + 2, min(page_num + 4, page_count)):
-                            if next_page_num in pages_processed:
-                                continue
-                            next_page = doc[next_page_num]
-                            next_page_text = next_page.get_text("text", flags=11)
-                            # Check if this page looks like it contains references
-                            if re.search(r'\[\d+\]|^\d+\.\s+[A-Z]|et al\.', next_page_text[:500], re.MULTILINE):
-                                references_pages_text += next_page_text
-                                pages_processed.add(next_page_num)
-                                logger.debug(f"Added page {next_page_num + 1} to references text ({len(next_page_text)} chars)")
-                            else:
-                                # Stop if we hit a page that doesn't look like references
-                                break
+                # Continue checking subsequent pages (up to 2 more pages) to see if references continue;
+                # stop at the first page that doesn't look like references
+                last_page_num = min(page_num + 4, page_count)
+                while next_page_num < last_page_num and _REF_PAGE_LIKE_RE.search(page_texts[next_page_num], 0, 500):
+                    references_pages.append(page_texts[next_page_num])
+                    logger.debug(f"Added page {next_page_num + 1} to references text ({len(page_texts[next_page_num])} chars)")
+                    next_page_num += 1
+            
+            page_num = next_page_num
         
+        references_pages_text = "".join(references_pages)
         if references_pages_text:
             ref_section = references_pages_text
             logger.info(f"✓ Extracted {len(ref_section)} chars from references page(s) (starting from page {references_start_page + 1 if references_start_page is not None else 'unknown'})")
         else:
             # Fallback: use last 3 pages if no references header found
             logger.warning("No references header found, using last 3 pages")
-            for page_num in range(max(0, page_count - 3), page_count):
-                page = doc[page_num]
-                ref_section += page.get_text("text", flags=11)
+            ref_section = "".join(page_texts[max(0, page_count - 3):])
             logger.info(f"Extracted {len(ref_section)} chars from last 3 pages")
     
-    # If no doc provided or extraction failed, fall back to text-based extraction
+    # If no pages provided or extraction failed, fall back to text-based extraction
     if not ref_section:
         logger.info("Falling back to text-based references section extraction")
-        ref_section_patterns = [
-            r'References?\s*\n(.+)',
-            r'Bibliography\s*\n(.+)',
-            r'Works\s+Cited\s*\n(.+)',
-        ]
-        
-        for pattern in ref_section_patterns:
-            match = re.search(pattern, full_text, re.IGNORECASE | re.DOTALL)
+        for pattern in _REF_SECTION_RES:
+            match = pattern.search(full_text)
             if match:
                 ref_section = match.group(1)
-                logger.info(f"Found references section using pattern: {pattern[:30]}...")
+                logger.info(f"Found references section using pattern: {pattern.pattern[:30]}...")
             break
     
         # If still no references section found, use last 60% of text
@@ -887,19 +1280,14 @@ def extract_references_with_gemini(full_text: str, doc=None, api_key: Optional[s
     
     if not ref_section:
         logger.error("Could not extract references section from PDF")
-        return []
+        return None
     
     # Use references section - CRITICAL: Use ALL of it, don't truncate from the end
     # References are on the last pages, so we MUST include all content from those pages
-    # Only limit if it's extremely long (over 50000 chars), otherwise use all of it
+    # Long sections are split into chunks for Gemini rather than truncated
     if ref_section:
-        # Use all of ref_section unless it's extremely long
-        if len(ref_section) > 50000:
-            logger.warning(f"Reference section is very long ({len(ref_section)} chars), using last 50000 chars")
-            text_sample = ref_section[-50000:]  # Take from the END to ensure we get last pages
-        else:
-            text_sample = ref_section  # Use ALL of it
-            logger.info(f"Using full reference section: {len(text_sample)} chars")
+        text_sample = ref_section  # Use ALL of it
+        logger.info(f"Using full reference section: {len(text_sample)} chars")
     else:
         # Fallback: use last 50000 chars from full text to ensure we get last pages
         text_sample = full_text[-50000:] if len(full_text) > 50000 else full_text
@@ -912,30 +1300,42 @@ def extract_references_with_gemini(full_text: str, doc=None, api_key: Optional[s
         logger.debug(f"Text sample preview (first 500 chars): {text_sample[:500]}...")
         logger.debug(f"Text sample preview (last 500 chars): ...{text_sample[-500:]}")
     
-    prompt = f"""Analyze the following research paper text and extract ALL references.
+    return text_sample
 
-Text:
-
-{text_sample}
-
-Return a JSON array containing ALL references found in the text.
+# With a response schema these prompt sections are redundant and only cost input tokens
+_REFERENCES_STRUCTURE_PROMPT = "" if _GEMINI_SCHEMA_MODE else """Return a JSON array containing ALL references found in the text.
 
 Required JSON structure:
 
-{{
+{
   "references": [
-    {{
+    {
       "title": "exact paper title",
       "authors": "all authors, comma-separated",
       "year": "publication year",
       "conference": "conference name (if conference paper, otherwise null)",
       "journal": "journal name (if journal paper, otherwise null)",
       "type": "journal | conference | book | thesis | report | dataset | website | standard | other"
-    }}
+    }
   ]
-}}
+}
 
-Extraction Rules (IMPORTANT):
+"""
+_REFERENCES_OUTPUT_RULES_PROMPT = "" if _GEMINI_SCHEMA_MODE else """Output rules:
+- Return ONLY valid JSON
+- No markdown, no explanations, no surrounding text
+
+"""
+
+def _references_prompt(text_sample: str) -> str:
+    """Prompt asking Gemini for every reference in text_sample as one JSON object"""
+    return f"""Analyze the following research paper text and extract ALL references.
+
+Text:
+
+{text_sample}
+
+{_REFERENCES_STRUCTURE_PROMPT}Extraction Rules (IMPORTANT):
 - Extract EVERY reference that appears in the text (journal, conference, book, thesis, report, dataset, website, standard, etc.)
 - If references are numbered [1] through [20] (or more), you MUST extract ALL of them.
 - DO NOT skip any reference for any reason.
@@ -971,11 +1371,7 @@ Reference type classification:
   - "standard" → IEEE standards, ISO standards, RFCs
   - "other" → anything that does not match above categories
 
-Output rules:
-- Return ONLY valid JSON
-- No markdown, no explanations, no surrounding text
-
-CRITICAL:
+{_REFERENCES_OUTPUT_RULES_PROMPT}CRITICAL:
 - Continue extracting references until you've captured EVERY numbered reference in the text.
 - Do not stop early, even if references span multiple lines or use unusual formatting.
 - This extraction must be exhaustive.
@@ -987,189 +1383,674 @@ IMPORTANT - Multiple papers by same author in single reference:
 - The author name may only appear once at the beginning, but you should extract each paper separately with the same author.
 - Look for patterns like: multiple quoted titles, multiple "vol." indicators, or multiple years in a single reference entry.
 - Each paper should have its own complete entry with title, authors, year, journal/conference, and type."""
+
+def _reference_from_gemini(order: int, ref_data: Dict[str, Any]) -> Reference:
+    """Reference for one entry of Gemini's "references" array"""
+    # Parse authors string to list
+    authors_str = ref_data.get('authors', '')
+    authors_list = [a.strip() for a in authors_str.split(',') if a.strip()] if authors_str else []
+    
+    # Convert year to int if it's a string
+    year = ref_data.get('year')
+    if isinstance(year, str):
+        try:
+            year = int(year)
+        except ValueError:
+            year = None
+    elif year is not None:
+        try:
+            year = int(year)
+        except (ValueError, TypeError):
+            year = None
+    
+    # Get venue (conference or journal)
+    venue = ref_data.get('conference') or ref_data.get('journal')
+    
+    # Get reference type
+    ref_type = ref_data.get('type', 'other')
+    
+    return Reference(
+        order=order,
+        raw_text=f"{ref_data.get('authors', '')} ({ref_data.get('year', '')}) {ref_data.get('title', '')}",
+        normalized_title=ref_data.get('title'),
+        normalized_authors=', '.join(authors_list) if authors_list else None,
+        normalized_year=year,
+        normalized_doi=None,
+        normalized_venue=venue,
+        ai_extraction={
+            'title': ref_data.get('title'),
+            'authors': authors_list,
+            'year': year,
+            'conference': ref_data.get('conference'),
+            'journal': ref_data.get('journal'),
+            'type': ref_type
+        }
+    )
+
+# Generation config optimized for speed
+_REFERENCES_GENERATION_CONFIG = {
+    'temperature': 0.1,  # Lower temperature for faster, more deterministic responses
+    'top_p': 0.95,       # Faster sampling
+    'top_k': 40,         # Limit candidate tokens for speed
+    'max_output_tokens': 8192,  # Higher limit for multiple references, but still bounded
+    **_GEMINI_JSON_MODE,
+    **({'response_schema': _GeminiReferenceList} if _GEMINI_SCHEMA_MODE else {}),
+}
+
+def extract_references_with_gemini(
+    full_text: str,
+    doc=None,
+    api_key: Optional[str] = None,
+    page_texts: Optional[List[str]] = None,
+    use_cache: bool = True
+) -> List[Reference]:
+    """
+    Extract all references from PDF using Gemini AI.
+    If doc is provided, extracts text only from the references page(s);
+    pass page_texts as well if the pages have already been read.
+    """
+    # Use provided API key or fall back to global GEMINI_API_KEY
+    gemini_key = api_key or GEMINI_API_KEY
+    if not gemini_key:
+        logger.warning("GEMINI_API_KEY not available, cannot use AI for reference extraction")
+        return []
+    
+    if page_texts is None and doc is not None:
+        page_texts = _references_page_texts(doc)
+    text_sample = _references_text_sample(full_text, page_texts)
+    if not text_sample:
+        return []
+    
+    return _gemini_references_from_sample(text_sample, gemini_key, use_cache)
+
+def _references_cache_key(text_sample: str) -> str:
+    """gemini_cache key for a whole references section, kept apart from per-reference keys"""
+    return f"references\n{text_sample}"
+
+def _references_from_gemini_data(gemini_data: Dict[str, Any]) -> List[Reference]:
+    return [
+        _reference_from_gemini(idx, ref_data)
+        for idx, ref_data in enumerate(gemini_data.get('references') or [], 1)
+    ]
+
+def _estimate_tokens(text: str) -> int:
+    """Rough Gemini token count for text (about 4 chars per token for English)"""
+    return len(text) // GEMINI_CHARS_PER_TOKEN
+
+def _references_chunk_max_chars() -> int:
+    """Largest chunk whose full references prompt fits GEMINI_REFERENCES_MAX_INPUT_TOKENS"""
+    prompt_chars = len(_references_prompt(""))
+    budget_chars = GEMINI_REFERENCES_MAX_INPUT_TOKENS * GEMINI_CHARS_PER_TOKEN - prompt_chars
+    return max(1, min(GEMINI_REFERENCES_CHUNK_CHARS, budget_chars))
+
+def _split_text_pieces(text: str, max_chars: int, split_res=_REF_PIECE_SPLIT_RES) -> List[str]:
+    """
+    text packed into pieces of at most max_chars, cut after blank lines where possible,
+    then after lines, and only as a last resort mid-line. The pieces join back to text.
+    """
+    if len(text) <= max_chars:
+        return [text]
+    if not split_res:
+        return [text[start:start + max_chars] for start in range(0, len(text), max_chars)]
+    
+    pieces = []
+    current = ""
+    for unit in split_res[0].split(text):
+        if not unit:
+            continue
+        if len(unit) > max_chars:
+            if current:
+                pieces.append(current)
+                current = ""
+            pieces.extend(_split_text_pieces(unit, max_chars, split_res[1:]))
+            continue
+        if current and len(current) + len(unit) > max_chars:
+            pieces.append(current)
+            current = ""
+        current += unit
+    if current:
+        pieces.append(current)
+    return pieces
+
+def _references_chunks(text_sample: str) -> List[str]:
+    """
+    text_sample split on reference entry boundaries into chunks of about
+    GEMINI_REFERENCES_CHUNK_CHARS, so no entry is cut in half. A section without
+    numbered entries, or an entry, whose prompt would exceed the input budget is
+    split on line boundaries instead; nothing is dropped.
+    """
+    fits_budget = lambda chunk: _estimate_tokens(_references_prompt(chunk)) <= GEMINI_REFERENCES_MAX_INPUT_TOKENS
+    if len(text_sample) <= GEMINI_REFERENCES_CHUNK_CHARS and fits_budget(text_sample):
+        return [text_sample]
+    
+    entries = [entry for entry in _REF_ENTRY_START_RE.split(text_sample) if entry.strip()]
+    if len(entries) < 2:
+        if fits_budget(text_sample):
+            return [text_sample]
+        pieces = _split_text_pieces(text_sample, _references_chunk_max_chars())
+        logger.info(f"Reference section is very long (~{_estimate_tokens(text_sample)} tokens) and has no numbered entries, split into {len(pieces)} chunks on line boundaries")
+        return pieces
+    
+    chunks = []
+    current = []
+    current_len = 0
+    for entry in entries:
+        if current and current_len + len(entry) > GEMINI_REFERENCES_CHUNK_CHARS:
+            chunks.append("".join(current))
+            current = []
+            current_len = 0
+        current.append(entry)
+        current_len += len(entry)
+    chunks.append("".join(current))
+    
+    # A single entry can still be over budget on its own
+    return [
+        piece
+        for chunk in chunks
+        for piece in ([chunk] if fits_budget(chunk) else _split_text_pieces(chunk, _references_chunk_max_chars()))
+    ]
+
+def _gemini_references_from_sample(text_sample: str, gemini_key: str, use_cache: bool = True) -> List[Reference]:
+    """
+    Gemini request and parsing for extract_references_with_gemini.
+    Uses no PyMuPDF objects, so it is safe to run in a worker thread.
+    Long sections are sent as chunks in parallel; references are merged in
+    document order, dropping repeated titles.
+    """
+    chunks = _references_chunks(text_sample)
+    if len(chunks) == 1:
+        references = _gemini_references_from_chunk(chunks[0], gemini_key, use_cache)
+    else:
+        logger.info(f"Reference section split into {len(chunks)} chunks for parallel AI extraction")
+        references = []
+        seen_titles = set()
+        # Requests are I/O bound, so the chunks run concurrently in threads
+        with ThreadPoolExecutor(max_workers=min(GEMINI_MAX_CONCURRENCY, len(chunks))) as executor:
+            for chunk_references in executor.map(
+                lambda chunk: _gemini_references_from_chunk(chunk, gemini_key, use_cache), chunks
+            ):
+                for ref in chunk_references:
+                    title_key = (ref.normalized_title or '').strip().lower()
+                    if title_key and title_key in seen_titles:
+                        continue
+                    seen_titles.add(title_key)
+                    references.append(ref.model_copy(update={'order': len(references) + 1}))
+    
+    # Check if we got fewer references than expected (warn if less than 15)
+    if references and len(references) < 15:
+        logger.warning(f"⚠ AI only returned {len(references)} references - this might be incomplete. Expected 20 references.")
+    logger.info(f"✓ Gemini AI extracted {len(references)} total references")
+    return references
+
+def _gemini_references_from_chunk(text_sample: str, gemini_key: str, use_cache: bool = True) -> List[Reference]:
+    """
+    One Gemini request for _gemini_references_from_sample.
+    The same references text always yields the same references, so results are
+    cached like per-reference extractions; use_cache=False forces a new request.
+    """
+    reference_data, _ = _gemini_reference_data_from_chunk(text_sample, gemini_key, use_cache)
+    references = _references_from_gemini_data({'references': reference_data})
+    if references:
+        logger.info(f"✓ Successfully converted {len(references)} references from AI extraction")
+    return references
+
+def _split_references_chunk(text_sample: str) -> List[str]:
+    """
+    text_sample cut in two halves on reference entry boundaries (on line boundaries
+    without numbered entries), for a reply that did not fit max_output_tokens.
+    Returns [text_sample] when there is nothing left to split.
+    """
+    units = [entry for entry in _REF_ENTRY_START_RE.split(text_sample) if entry.strip()]
+    if len(units) < 2:
+        units = [line for line in _REF_PIECE_SPLIT_RES[-1].split(text_sample) if line]
+    if len(units) < 2:
+        return [text_sample]
+    half = len(units) // 2
+    return ["".join(units[:half]), "".join(units[half:])]
+
+def _gemini_reference_data_from_chunk(text_sample: str, gemini_key: str, use_cache: bool = True) -> Tuple[List[Dict[str, Any]], bool]:
+    """
+    Raw reference objects Gemini returns for text_sample, and whether the list is complete.
+    A reply cut off at max_output_tokens is not used as the result: the text is split
+    in two and each half is requested on its own. Only complete lists are cached.
+    """
+    cache_key = _references_cache_key(text_sample)
+    cached = gemini_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        logger.info(f"✓ Gemini AI references served from cache ({len(cached.get('references') or [])} references)")
+        return cached.get('references') or [], True
+    
+    prompt = _references_prompt(text_sample)
     
     # Configure Gemini with the API key
     try:
-        genai.configure(api_key=gemini_key)
+        configure_gemini(gemini_key)
     except Exception as e:
         logger.warning(f"Failed to configure Gemini AI with provided key: {e}")
-        return []
+        return [], False
+    
+    # Use fastest model with speed-optimized config, falling back if it fails
+    response = _generate_with_gemini(prompt, _REFERENCES_GENERATION_CONFIG)
+    if response is None:
+        logger.error("Failed to generate content for reference extraction")
+        return [], False
     
-    # Use fastest model with speed-optimized config
+    response_text = None
     try:
-        model = genai.GenerativeModel(
-            model_name,
-            generation_config=generation_config
-        )
-        logger.debug(f"Using high-speed Gemini model for reference extraction: {model_name}")
+        # Parse JSON response (removing markdown code blocks if present)
+        response_text = response.text
+        gemini_data = _parse_gemini_json(response_text)
+        reference_data = gemini_data.get('references') or []
+        logger.info(f"AI returned {len(reference_data)} references")
+        if reference_data:
+            gemini_cache.set(cache_key, {'references': reference_data})
+        return reference_data, True
         
-        # Generate content with timing for performance monitoring
-        start_time = time.time()
-        response = model.generate_content(prompt)
-        elapsed_time = time.time() - start_time
-        logger.info(f"✓ Successfully used Gemini model for reference extraction: {model_name} (took {elapsed_time:.2f}s)")
+    except json.JSONDecodeError as e:
+        # Usually a reply cut off at max_output_tokens: the references after the cut
+        # are missing, so the text is requested again in smaller pieces
+        salvaged = _JsonArrayStream('references').feed(response_text) if response_text else []
+        if salvaged or _hit_max_output_tokens(response):
+            parts = _split_references_chunk(text_sample)
+            if len(parts) > 1:
+                logger.warning(f"Gemini AI references reply was incomplete ({e}), requesting the text again in {len(parts)} parts")
+                reference_data = []
+                complete = True
+                for part in parts:
+                    part_data, part_complete = _gemini_reference_data_from_chunk(part, gemini_key, use_cache)
+                    reference_data.extend(part_data)
+                    complete = complete and part_complete
+                if complete and reference_data:
+                    gemini_cache.set(cache_key, {'references': reference_data})
+                return reference_data, complete
+            if salvaged:
+                logger.warning(f"Gemini AI references reply was incomplete ({e}) and the text cannot be split further, kept {len(salvaged)} complete references")
+                return salvaged, False
+        logger.warning(f"Failed to parse Gemini AI JSON response for references: {e}")
+        logger.debug(f"Response was: {response_text[:200] if response_text else 'N/A'}")
+        return [], False
     except Exception as e:
-        logger.warning(f"High-speed model {model_name} failed: {str(e)[:100]}, trying fallback...")
-        last_error = e
-        # Fallback to gemini-2.0-flash if 2.5-flash fails
+        logger.warning(f"Error processing Gemini AI reference extraction: {str(e)}")
+        return [], False
+
+def _hit_max_output_tokens(response) -> bool:
+    """Whether Gemini stopped the reply at max_output_tokens"""
+    try:
+        finish_reason = response.candidates[0].finish_reason
+    except (AttributeError, IndexError, TypeError):
+        return False
+    return getattr(finish_reason, 'name', str(finish_reason)) == 'MAX_TOKENS'
+
+class _JsonArrayStream:
+    """
+    Incremental reader for the objects of one top-level JSON array, e.g. the
+    "references" list of a streamed Gemini reply. feed() takes the next piece
+    of text and returns the objects completed by it; anything before the
+    array (markdown fences, the opening brace) is skipped.
+    """
+    
+    def __init__(self, key: str):
+        self._key = f'"{key}"'
+        self._buffer = ''
+        self._pos = 0
+        self._in_array = False
+        self._done = False
+        self._depth = 0
+        self._start = 0
+        self._in_string = False
+        self._escaped = False
+    
+    @property
+    def complete(self) -> bool:
+        """Whether the closing ']' of the array has been read"""
+        return self._done
+    
+    def feed(self, text: str) -> List[Dict[str, Any]]:
+        if self._done or not text:
+            return []
+        self._buffer += text
+        
+        if not self._in_array:
+            key_pos = self._buffer.find(self._key)
+            bracket = self._buffer.find('[', key_pos + len(self._key)) if key_pos != -1 else -1
+            if bracket == -1:
+                return []
+            self._in_array = True
+            self._buffer = self._buffer[bracket + 1:]
+            self._pos = 0
+        
+        objects = []
+        buffer = self._buffer
+        pos = self._pos
+        consumed = 0
+        while pos < len(buffer):
+            char = buffer[pos]
+            if self._in_string:
+                if self._escaped:
+                    self._escaped = False
+                elif char == '\\':
+                    self._escaped = True
+                elif char == '"':
+                    self._in_string = False
+            elif char == '"':
+                self._in_string = True
+            elif char == '{':
+                if self._depth == 0:
+                    self._start = pos
+                self._depth += 1
+            elif char == '}':
+                self._depth -= 1
+                if self._depth == 0:
+                    try:
+                        objects.append(_json_loads(buffer[self._start:pos + 1]))
+                    except json.JSONDecodeError as e:
+                        logger.warning(f"Skipping malformed streamed reference: {e}")
+                    consumed = pos + 1
+            elif char == ']' and self._depth == 0:
+                self._done = True
+                break
+            pos += 1
+        
+        # Keep only the unfinished object, if any
+        self._buffer = buffer[consumed:]
+        self._start -= consumed
+        self._pos = pos - consumed
+        return objects
+
+def stream_references_with_gemini(
+    full_text: str,
+    doc=None,
+    api_key: Optional[str] = None,
+    page_texts: Optional[List[str]] = None,
+    use_cache: bool = True
+) -> Iterator[Reference]:
+    """
+    Like extract_references_with_gemini, but streams the Gemini reply and yields
+    each Reference as soon as its JSON object is complete.
+    Falls back to the blocking request if streaming fails before any reference arrives.
+    """
+    gemini_key = api_key or GEMINI_API_KEY
+    if not gemini_key:
+        logger.warning("GEMINI_API_KEY not available, cannot use AI for reference extraction")
+        return
+    
+    if page_texts is None and doc is not None:
+        page_texts = _references_page_texts(doc)
+    text_sample = _references_text_sample(full_text, page_texts)
+    if not text_sample:
+        return
+    
+    if len(_references_chunks(text_sample)) > 1:
+        # Parallel chunk requests finish sooner than one long streamed reply
+        yield from _gemini_references_from_sample(text_sample, gemini_key, use_cache)
+        return
+    
+    cache_key = _references_cache_key(text_sample)
+    cached = gemini_cache.get(cache_key) if use_cache else None
+    if cached is not None:
+        logger.info("✓ Gemini AI references served from cache")
+        yield from _references_from_gemini_data(cached)
+        return
+    
+    try:
+        configure_gemini(gemini_key)
+    except Exception as e:
+        logger.warning(f"Failed to configure Gemini AI with provided key: {e}")
+        return
+    
+    prompt = _references_prompt(text_sample)
+    streamed = []
+    for model_name in GEMINI_MODELS:
+        stream = _JsonArrayStream('references')
         try:
-            model_name = 'gemini-2.0-flash'
-            model = genai.GenerativeModel(
-                model_name,
-                generation_config=generation_config
-            )
             start_time = time.time()
-            response = model.generate_content(prompt)
+            response = get_gemini_model(model_name).generate_content(
+                prompt, generation_config=_REFERENCES_GENERATION_CONFIG, stream=True
+            )
+            for chunk in response:
+                try:
+                    chunk_text = chunk.text
+                except ValueError:
+                    # Chunks without text parts (e.g. the final finish-reason chunk)
+                    continue
+                for ref_data in stream.feed(chunk_text):
+                    streamed.append(ref_data)
+                    yield _reference_from_gemini(len(streamed), ref_data)
             elapsed_time = time.time() - start_time
-            logger.info(f"✓ Using fallback model for reference extraction: {model_name} (took {elapsed_time:.2f}s)")
-        except Exception as e2:
-            logger.error(f"All Gemini models failed for reference extraction. Last error: {e2}")
-            return []
+            logger.info(f"✓ Streamed {len(streamed)} references from Gemini model {model_name} (took {elapsed_time:.2f}s)")
+            if streamed and not stream.complete:
+                # Cut off at max_output_tokens: request the text again in parts and
+                # send on the references that were not streamed yet
+                logger.warning("Gemini stream ended before the references list was closed, requesting the rest")
+                seen_titles = {(ref_data.get('title') or '').strip().lower() for ref_data in streamed}
+                for part in _split_references_chunk(text_sample):
+                    part_data, _ = _gemini_reference_data_from_chunk(part, gemini_key, use_cache)
+                    for ref_data in part_data:
+                        title_key = (ref_data.get('title') or '').strip().lower()
+                        if title_key and title_key in seen_titles:
+                            continue
+                        seen_titles.add(title_key)
+                        streamed.append(ref_data)
+                        yield _reference_from_gemini(len(streamed), ref_data)
+                return
+            if streamed:
+                gemini_cache.set(cache_key, {'references': streamed})
+            return
+        except Exception as e:
+            if streamed:
+                # References already sent cannot be taken back; stop here
+                logger.warning(f"Gemini stream from {model_name} broke off after {len(streamed)} references: {str(e)[:100]}")
+                return
+            logger.warning(f"Streaming from Gemini model {model_name} failed: {str(e)[:100]}, trying fallback...")
+    
+    logger.warning("Gemini streaming unavailable, falling back to a single blocking request")
+    yield from _gemini_references_from_sample(text_sample, gemini_key, use_cache)
+
+def robust_pdf_parser(pdf_path: Optional[str] = None, api_key: Optional[str] = None, doc=None,
+                      use_cache: bool = True, force_ai: bool = False) -> Dict[str, Any]:
+    """
+    Extract title, authors, and year using Gemini AI.
+    Well-tagged PDFs (title and author metadata plus a year on the first page) skip the
+    Gemini call unless force_ai is set.
+    Reads the first page with PyMuPDF; pass an already open doc to avoid reopening the file.
+    """
+    result = _empty_first_page_fields()
     
-    if model is None or response is None:
-        logger.error(f"Failed to generate content for reference extraction. Last error: {last_error}")
-        return []
+    # Use provided API key or fall back to global GEMINI_API_KEY
+    gemini_key = api_key or GEMINI_API_KEY
     
+    owns_doc = doc is None
     try:
-        # Parse response
-        response_text = response.text.strip()
-        
-        # Clean up response (remove markdown code blocks if present)
-        if response_text.startswith("```json"):
-            response_text = response_text[7:]
-        if response_text.startswith("```"):
-            response_text = response_text[3:]
-        if response_text.endswith("```"):
-            response_text = response_text[:-3]
-        response_text = response_text.strip()
-        
-        # Parse JSON response
-        gemini_data = json.loads(response_text)
-        
-        # Convert to Reference objects
-        references = []
-        if gemini_data.get('references'):
-            num_refs = len(gemini_data['references'])
-            logger.info(f"AI returned {num_refs} references")
-            
-            # Check if we got fewer references than expected (warn if less than 15)
-            if num_refs < 15:
-                logger.warning(f"⚠ AI only returned {num_refs} references - this might be incomplete. Expected 20 references.")
-            
-            for idx, ref_data in enumerate(gemini_data['references'], 1):
-                # Parse authors string to list
-                authors_str = ref_data.get('authors', '')
-                authors_list = [a.strip() for a in authors_str.split(',') if a.strip()] if authors_str else []
-                
-                # Convert year to int if it's a string
-                year = ref_data.get('year')
-                if isinstance(year, str):
-                    try:
-                        year = int(year)
-                    except ValueError:
-                        year = None
-                elif year is not None:
-                    try:
-                        year = int(year)
-                    except (ValueError, TypeError):
-                        year = None
-                
-                # Get venue (conference or journal)
-                venue = ref_data.get('conference') or ref_data.get('journal')
-                
-                # Get reference type
-                ref_type = ref_data.get('type', 'other')
-                
-                ref = Reference(
-                    order=idx,
-                    raw_text=f"{ref_data.get('authors', '')} ({ref_data.get('year', '')}) {ref_data.get('title', '')}",
-                    normalized_title=ref_data.get('title'),
-                    normalized_authors=', '.join(authors_list) if authors_list else None,
-                    normalized_year=year,
-                    normalized_doi=None,
-                    normalized_venue=venue,
-                    ai_extraction={
-                        'title': ref_data.get('title'),
-                        'authors': authors_list,
-                        'year': year,
-                        'conference': ref_data.get('conference'),
-                        'journal': ref_data.get('journal'),
-                        'type': ref_type
-                    }
-                )
-                references.append(ref)
-            
-            logger.info(f"✓ Successfully converted {len(references)} references from AI extraction")
-        
-        logger.info(f"✓ Gemini AI extracted {len(references)} total references")
-        return references
-        
-    except json.JSONDecodeError as e:
-        logger.warning(f"Failed to parse Gemini AI JSON response for references: {e}")
-        logger.debug(f"Response was: {response_text[:200] if 'response_text' in locals() else 'N/A'}")
-        return []
+        if owns_doc:
+            doc = fitz.open(pdf_path)
+        first_page_text = _first_page_text(doc)
+        result['metadata'] = _pdf_metadata(doc)
+        metadata_fields = None if force_ai else _first_page_fields_from_metadata(result['metadata'], first_page_text)
+        if metadata_fields:
+            result.update(metadata_fields)
+        elif first_page_text:
+            result.update(first_page_fields_with_gemini(first_page_text, gemini_key, use_cache))
     except Exception as e:
-        logger.warning(f"Error processing Gemini AI reference extraction: {str(e)}")
-        return []
+        logger.warning(f"Error in robust_pdf_parser: {str(e)}")
+    finally:
+        if owns_doc and doc is not None:
+            doc.close()
+    
+    return result
 
-def robust_pdf_parser(pdf_path: str, api_key: Optional[str] = None) -> Dict[str, Any]:
-    """Extract title, authors, and year using ONLY Gemini AI"""
-    result = {
+def _empty_first_page_fields() -> Dict[str, Any]:
+    return {
         'title': None,
         'authors': [],
         'year': None,
         'metadata': {},
         'ai_extraction': None  # Store AI extraction data separately
     }
+
+def _first_page_text(doc) -> str:
+    """First page in reading order (sort=True, like pdfplumber's layout text)"""
+    return doc[0].get_text("text", sort=True) if len(doc) > 0 else ""
+
+def _pdf_metadata(doc) -> Dict[str, str]:
+    metadata = doc.metadata
+    if not metadata:
+        return {}
+    return {
+        'title': metadata.get('title', ''),
+        'author': metadata.get('author', ''),
+        'subject': metadata.get('subject', ''),
+        'creator': metadata.get('creator', ''),
+        'producer': metadata.get('producer', ''),
+        'creationDate': str(metadata.get('creationDate', '')),
+        'modDate': str(metadata.get('modDate', '')),
+    }
+
+_METADATA_AUTHOR_SPLIT_RE = re.compile(r'\s*(?:;|,|\band\b|&)\s*')
+# Titles that exporters write instead of the paper's: application prefixes, placeholders, file names
+_METADATA_JUNK_TITLE_RE = re.compile(
+    r'^(?:microsoft\s+\w+\s+-|untitled|document\d*\b|presentation\d*\b|slide\s*\d*\b)'
+    r'|\.(?:docx?|pdf|tex|dvi|ps|rtf|odt|pptx?)\s*$'
+    r'|[\\/]',
+    re.IGNORECASE
+)
+METADATA_MIN_TITLE_WORDS = 3
+
+def _metadata_looks_real(title: str, author: str) -> bool:
+    """False for exporter defaults such as 'Microsoft Word - draft3.docx' or an 'Administrator' author"""
+    if _METADATA_JUNK_TITLE_RE.search(title) or len(title.split()) < METADATA_MIN_TITLE_WORDS:
+        return False
+    # A single token ('Administrator', 'jsmith') is an account name, not an author list
+    return len(re.findall(r'\w+', author)) >= 2
+
+def _first_page_fields_from_metadata(pdf_metadata: Dict[str, str], first_page_text: str) -> Optional[Dict[str, Any]]:
+    """
+    Title, authors and year from the PDF's own metadata, or None if it is not complete enough
+    to skip Gemini (needs a real-looking title and author, and a year on the first page).
+    """
+    title = (pdf_metadata.get('title') or '').strip()
+    author = (pdf_metadata.get('author') or '').strip()
+    if not title or not author or not _metadata_looks_real(title, author):
+        return None
+    year = extract_year(first_page_text)
+    if not year:
+        return None
     
-    # Use provided API key or fall back to global GEMINI_API_KEY
-    gemini_key = api_key or GEMINI_API_KEY
+    authors = [name for name in _METADATA_AUTHOR_SPLIT_RE.split(author) if name]
+    logger.info(f"✓ Using PDF metadata for title/authors/year, skipping Gemini: {title[:80]}")
+    return {'title': title, 'authors': authors, 'year': year}
+
+def first_page_fields_with_gemini(first_page_text: str, gemini_key: Optional[str], use_cache: bool = True) -> Dict[str, Any]:
+    """
+    Title, authors, year and ai_extraction for robust_pdf_parser from the first page text.
+    Uses no PyMuPDF objects, so it is safe to run in a worker thread.
+    """
+    result = {}
+    # USE ONLY GEMINI AI - No manual extraction
+    if gemini_key:
+        try:
+            gemini_data = extract_with_gemini(first_page_text, api_key=gemini_key, use_cache=use_cache)
+            if gemini_data:
+                result['ai_extraction'] = gemini_data
+                
+                # Use Gemini AI results exclusively
+                if gemini_data.get('title'):
+                    result['title'] = gemini_data['title']
+                    logger.info(f"✓ Gemini AI extracted title: {result['title'][:80]}...")
+                
+                if gemini_data.get('authors'):
+                    result['authors'] = gemini_data['authors']
+                    logger.info(f"✓ Gemini AI extracted authors: {result['authors']}")
+                
+                if gemini_data.get('year'):
+                    result['year'] = gemini_data['year']
+                    logger.info(f"✓ Gemini AI extracted year: {result['year']}")
+        except Exception as e:
+            logger.error(f"Gemini AI extraction failed: {e}")
+            logger.warning("No fallback extraction - AI is required")
+    else:
+        logger.error("GEMINI_API_KEY not configured - AI extraction required")
+    return result
+
+def _references_full_text(page_texts: List[str]) -> str:
+    """All pages from _references_page_texts as one string"""
+    page_count = len(page_texts)
+    logger.info(f"PDF has {page_count} pages")
+    
+    # Log last few pages to ensure we're getting them
+    for page_num in range(max(0, page_count - 3), page_count):
+        logger.debug(f"Page {page_num + 1} text length: {len(page_texts[page_num])} chars")
+    
+    full_text = "".join(page_texts)
+    logger.info(f"Total extracted text length: {len(full_text)} characters")
+    return full_text
+
+def _regex_references_section(full_text: str) -> str:
+    """References section for the regex extractor (last 60% of text if no header is found)"""
+    # Look for references section
+    # References are usually at the end
+    ref_section = ""
+    for pattern in _REF_SECTION_RES:
+        match = pattern.search(full_text)
+        if match:
+            ref_section = match.group(1)
+            break
     
-    try:
-        with pdfplumber.open(pdf_path) as pdf:
-            if len(pdf.pages) > 0:
-                first_page_text = pdf.pages[0].extract_text()
-                if first_page_text:
-                    # USE ONLY GEMINI AI - No manual extraction
-                    if gemini_key:
-                        try:
-                            gemini_data = extract_with_gemini(first_page_text, api_key=gemini_key)
-                            if gemini_data:
-                                result['ai_extraction'] = gemini_data
-                                
-                                # Use Gemini AI results exclusively
-                                if gemini_data.get('title'):
-                                    result['title'] = gemini_data['title']
-                                    logger.info(f"✓ Gemini AI extracted title: {result['title'][:80]}...")
-                                
-                                if gemini_data.get('authors'):
-                                    result['authors'] = gemini_data['authors']
-                                    logger.info(f"✓ Gemini AI extracted authors: {result['authors']}")
-                                
-                                if gemini_data.get('year'):
-                                    result['year'] = gemini_data['year']
-                                    logger.info(f"✓ Gemini AI extracted year: {result['year']}")
-                        except Exception as e:
-                            logger.error(f"Gemini AI extraction failed: {e}")
-                            logger.warning("No fallback extraction - AI is required")
-                    else:
-                        logger.error("GEMINI_API_KEY not configured - AI extraction required")
-            
-            # Get PDF metadata (for reference only, not used for extraction)
-            if pdf.metadata:
-                result['metadata'] = {
-                    'title': pdf.metadata.get('Title', ''),
-                    'author': pdf.metadata.get('Author', ''),
-                    'subject': pdf.metadata.get('Subject', ''),
-                    'creator': pdf.metadata.get('Creator', ''),
-                    'producer': pdf.metadata.get('Producer', ''),
-                    'creationDate': str(pdf.metadata.get('CreationDate', '')),
-                    'modDate': str(pdf.metadata.get('ModDate', '')),
-                }
-    except Exception as e:
-        logger.warning(f"Error in robust_pdf_parser: {str(e)}")
+    # If no references section found, try last 60% of text (increased to catch all references from last pages)
+    if not ref_section:
+        ref_section = full_text[-int(len(full_text) * 0.6):]
+        logger.info(f"No references section header found in regex fallback, using last 60% of text")
+        logger.info(f"This ensures we capture content from the last pages where references are located")
     
-    return result
+    # Log reference section extraction for debugging
+    logger.info(f"Extracting references from text using regex (length: {len(ref_section)})")
+    if ref_section:
+        logger.info(f"Reference section preview: {ref_section[:200]}...")
+    
+    return ref_section
+
+def _no_cache(header_value: Optional[str]) -> bool:
+    """True when an X-No-Cache header asks to bypass cached Gemini results"""
+    return bool(header_value) and header_value.lower() in ("1", "true", "yes")
+
+async def _read_upload(file: UploadFile) -> bytes:
+    content = await file.read()
+    # Ensure we have bytes
+    if isinstance(content, str):
+        content = content.encode('latin-1')
+    return content
+
+async def _open_upload(file: UploadFile):
+    """Open an uploaded PDF with PyMuPDF from memory, without a temp file"""
+    return fitz.open(stream=await _read_upload(file), filetype="pdf")
+
+def _combined_metadata(robust_data: Dict[str, Any], metadata: Dict[str, Any]) -> Dict[str, Any]:
+    """Combine PyMuPDF metadata with robust extraction (prioritize AI extraction)"""
+    metadata = metadata or {}
+    return {
+        "title": robust_data.get('title') or metadata.get("title", ""),
+        "author": metadata.get("author", ""),
+        "authors": robust_data.get('authors', []),
+        "year": robust_data.get('year'),
+        "subject": metadata.get("subject", ""),
+        "creator": metadata.get("creator", ""),
+        "producer": metadata.get("producer", ""),
+        "creationDate": metadata.get("creationDate", ""),
+        "modDate": metadata.get("modDate", ""),
+        "ai_extraction": robust_data.get('ai_extraction'),  # Include AI extraction data
+    }
+
+def _accepted_ai_references(ai_references: List[Reference]) -> List[Reference]:
+    """AI references, or [] when there are too few and the regex fallback should run"""
+    if not ai_references:
+        logger.info("AI extraction returned no references, falling back to regex extraction")
+        return []
+    logger.info(f"✓ Successfully extracted {len(ai_references)} references using Gemini AI")
+    # Only use regex fallback if we get less than 10 references (minimum threshold)
+    if len(ai_references) < 10:
+        logger.warning(f"⚠ Only {len(ai_references)} references extracted - minimum expected is 10. Falling back to regex extraction.")
+        return []
+    logger.info(f"✓ Extracted {len(ai_references)} references (meets minimum threshold of 10)")
+    return ai_references
 
 @app.get("/health")
 async def health_check():
@@ -1179,36 +2060,24 @@ async def health_check():
 @app.post("/extract-text", response_model=TextExtractionResponse)
 async def extract_text(
     file: UploadFile = File(...),
-    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key")
+    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key"),
+    x_no_cache: Optional[str] = Header(None, alias="X-No-Cache"),
+    force_ai: bool = False
 ):
     """
     Extract text from PDF file.
-    Accepts optional X-Gemini-API-Key header for AI extraction.
+    Accepts optional X-Gemini-API-Key header for AI extraction, and X-No-Cache: 1
+    to skip cached Gemini results. Pass ?force_ai=true to call Gemini even when the
+    PDF metadata already has the title, authors and year.
     """
     doc = None
-    temp_file = None
     try:
-        # Read file content
-        content = await file.read()
-        # Ensure we have bytes
-        if isinstance(content, str):
-            content = content.encode('latin-1')
-        
-        # Use temporary file for more reliable PDF handling
-        # PyMuPDF sometimes has issues with BytesIO streams
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Open PDF with PyMuPDF using file path
-        doc = fitz.open(temp_file_path)
+        # Open the uploaded PDF with PyMuPDF straight from memory
+        doc = await _open_upload(file)
         
         # Extract text from all pages
-        full_text = ""
         page_count = len(doc)
-        for page_num in range(page_count):
-            page = doc[page_num]
-            full_text += page.get_text()
+        full_text = "".join(doc[page_num].get_text() for page_num in range(page_count))
         
         # Get metadata
         metadata = doc.metadata
@@ -1216,27 +2085,13 @@ async def extract_text(
         # Use robust PDF parser to extract title, authors, year from first page
         # Pass API key from header if provided, otherwise use env variable
         api_key = x_gemini_api_key or GEMINI_API_KEY
-        robust_data = robust_pdf_parser(temp_file_path, api_key=api_key)
-        
-        # Combine PyMuPDF metadata with robust extraction (prioritize AI extraction)
-        combined_metadata = {
-            "title": robust_data.get('title') or metadata.get("title", ""),
-                "author": metadata.get("author", ""),
-            "authors": robust_data.get('authors', []),
-            "year": robust_data.get('year'),
-                "subject": metadata.get("subject", ""),
-                "creator": metadata.get("creator", ""),
-                "producer": metadata.get("producer", ""),
-                "creationDate": metadata.get("creationDate", ""),
-                "modDate": metadata.get("modDate", ""),
-            "ai_extraction": robust_data.get('ai_extraction'),  # Include AI extraction data
-        }
+        robust_data = robust_pdf_parser(api_key=api_key, doc=doc, use_cache=not _no_cache(x_no_cache), force_ai=force_ai)
         
         # Get page count before closing
         result = TextExtractionResponse(
             text=full_text,
             pages=page_count,
-            metadata=combined_metadata
+            metadata=_combined_metadata(robust_data, metadata)
         )
         
         return result
@@ -1246,56 +2101,26 @@ async def extract_text(
     finally:
         if doc:
             doc.close()
-        # Clean up temporary file
-        if 'temp_file_path' in locals() and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file: {e}")
 
 @app.post("/extract-references", response_model=ReferenceExtractionResponse)
 async def extract_references(
     file: UploadFile = File(...),
-    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key")
+    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key"),
+    x_no_cache: Optional[str] = Header(None, alias="X-No-Cache")
 ):
     """
     Extract references from PDF file.
-    Accepts optional X-Gemini-API-Key header for AI extraction.
+    Accepts optional X-Gemini-API-Key header for AI extraction, and X-No-Cache: 1
+    to skip cached Gemini results.
     """
     doc = None
-    temp_file_path = None
     try:
-        # Read file content
-        content = await file.read()
-        # Ensure we have bytes
-        if isinstance(content, str):
-            content = content.encode('latin-1')
-        
-        # Use temporary file for more reliable PDF handling
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
-        
-        # Open PDF with PyMuPDF using file path
-        doc = fitz.open(temp_file_path)
+        # Open the uploaded PDF with PyMuPDF straight from memory
+        doc = await _open_upload(file)
         
-        # Extract text from all pages
-        # Use get_text with flags to preserve formatting and get full text
-        full_text = ""
-        page_count = len(doc)
-        logger.info(f"PDF has {page_count} pages")
-        
-        # Extract text from all pages
-        for page_num in range(page_count):
-            page = doc[page_num]
-            # flags=11 preserves layout and ensures full text extraction
-            page_text = page.get_text("text", flags=11)
-            full_text += page_text
-            # Log last few pages to ensure we're getting them
-            if page_num >= page_count - 3:
-                logger.debug(f"Page {page_num + 1} text length: {len(page_text)} chars")
-        
-        logger.info(f"Total extracted text length: {len(full_text)} characters")
+        # Extract text from all pages, once; the references-page selection reuses them
+        page_texts = _references_page_texts(doc)
+        full_text = _references_full_text(page_texts)
         
         references = []
         
@@ -1310,19 +2135,11 @@ async def extract_references(
                 if len(full_text) > 1000:  # Only use AI for substantial papers
                     logger.info("Attempting to extract references using Gemini AI...")
                     logger.info(f"Full text length: {len(full_text)} characters")
-                    # Pass the doc object and API key so we can extract only the references page(s)
-                    ai_references = extract_references_with_gemini(full_text, doc=doc, api_key=api_key)
-                    if ai_references and len(ai_references) > 0:
-                        references = ai_references
-                        logger.info(f"✓ Successfully extracted {len(references)} references using Gemini AI")
-                        # Only use regex fallback if we get less than 10 references (minimum threshold)
-                        if len(references) < 10:
-                            logger.warning(f"⚠ Only {len(references)} references extracted - minimum expected is 10. Falling back to regex extraction.")
-                            references = []  # Clear and use regex fallback
-                        else:
-                            logger.info(f"✓ Extracted {len(references)} references (meets minimum threshold of 10)")
-                    else:
-                        logger.info("AI extraction returned no references, falling back to regex extraction")
+                    # Pass the pages and API key so we can extract only the references page(s)
+                    ai_references = extract_references_with_gemini(
+                        full_text, api_key=api_key, page_texts=page_texts, use_cache=not _no_cache(x_no_cache)
+                    )
+                    references = _accepted_ai_references(ai_references)
                 else:
                     logger.debug("Text too short, skipping AI extraction")
             except Exception as e:
@@ -1330,31 +2147,7 @@ async def extract_references(
         
         # Fallback to regex-based extraction if AI didn't work or not available
         if not references:
-            # Look for references section
-            # References are usually at the end
-            ref_section_patterns = [
-                r'References?\s*\n(.+)',
-                r'Bibliography\s*\n(.+)',
-                r'Works\s+Cited\s*\n(.+)',
-            ]
-            
-            ref_section = ""
-            for pattern in ref_section_patterns:
-                match = re.search(pattern, full_text, re.IGNORECASE | re.DOTALL)
-                if match:
-                    ref_section = match.group(1)
-                    break
-            
-            # If no references section found, try last 60% of text (increased to catch all references from last pages)
-            if not ref_section:
-                ref_section = full_text[-int(len(full_text) * 0.6):]
-                logger.info(f"No references section header found in regex fallback, using last 60% of text")
-                logger.info(f"This ensures we capture content from the last pages where references are located")
-            
-            # Log reference section extraction for debugging
-            logger.info(f"Extracting references from text using regex (length: {len(ref_section)})")
-            if ref_section:
-                logger.info(f"Reference section preview: {ref_section[:200]}...")
+            ref_section = _regex_references_section(full_text)
             
             # Extract references from text using regex
             references = extract_references_from_text(ref_section)
@@ -1370,98 +2163,305 @@ async def extract_references(
     finally:
         if doc:
             doc.close()
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
+
+@app.post("/extract-references/stream")
+async def extract_references_stream(
+    file: UploadFile = File(...),
+    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key"),
+    x_no_cache: Optional[str] = Header(None, alias="X-No-Cache")
+):
+    """
+    Extract references from PDF file, streamed as NDJSON (one Reference per line).
+    Gemini references are sent as soon as each one is complete; if AI yields none,
+    the regex-extracted references are sent instead.
+    Accepts optional X-Gemini-API-Key header for AI extraction, and X-No-Cache: 1
+    to skip cached Gemini results.
+    """
+    doc = None
+    try:
+        # Open the uploaded PDF with PyMuPDF straight from memory
+        doc = await _open_upload(file)
+        page_texts = _references_page_texts(doc)
+        full_text = _references_full_text(page_texts)
+    except Exception as e:
+        logger.error(f"Error extracting references: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error extracting references: {str(e)}")
+    finally:
+        # Everything needed from the PDF has been read before streaming starts
+        if doc:
+            doc.close()
+    
+    api_key = x_gemini_api_key or GEMINI_API_KEY
+    use_cache = not _no_cache(x_no_cache)
+    
+    def ndjson_lines():
+        # Runs in Starlette's threadpool
+        sent = 0
+        if api_key and len(full_text) > 1000:
             try:
-                os.unlink(temp_file_path)
+                for ref in stream_references_with_gemini(
+                    full_text, api_key=api_key, page_texts=page_texts, use_cache=use_cache
+                ):
+                    sent += 1
+                    yield _json_dumps(ref.model_dump()) + '\n'
             except Exception as e:
-                logger.warning(f"Failed to delete temp file: {e}")
+                logger.warning(f"AI reference streaming failed: {e}")
+        if not sent:
+            for ref in extract_references_from_text(_regex_references_section(full_text)):
+                yield _json_dumps(ref.model_dump()) + '\n'
+    
+    return StreamingResponse(ndjson_lines(), media_type="application/x-ndjson")
 
-@app.post("/extract-figures", response_model=FigureExtractionResponse)
-async def extract_figures(file: UploadFile = File(...)):
+@app.post("/extract-document", response_model=DocumentExtractionResponse)
+async def extract_document(
+    file: UploadFile = File(...),
+    x_gemini_api_key: Optional[str] = Header(None, alias="X-Gemini-API-Key"),
+    x_no_cache: Optional[str] = Header(None, alias="X-No-Cache"),
+    force_ai: bool = False
+):
     """
-    Extract figures/images from PDF file and generate perceptual hashes.
+    Extract text, metadata, and references from PDF file in one request.
+    The first-page and references-page Gemini calls are independent, so they run concurrently.
+    Accepts optional X-Gemini-API-Key header for AI extraction, and X-No-Cache: 1
+    to skip cached Gemini results. Pass ?force_ai=true to call Gemini even when the
+    PDF metadata already has the title, authors and year.
     """
     doc = None
-    temp_file_path = None
     try:
-        # Read file content
-        content = await file.read()
-        # Ensure we have bytes
-        if isinstance(content, str):
-            content = content.encode('latin-1')
+        # Open the uploaded PDF with PyMuPDF straight from memory
+        doc = await _open_upload(file)
         
-        # Use temporary file for more reliable PDF handling
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
-            temp_file.write(content)
-            temp_file_path = temp_file.name
+        # All PyMuPDF reads happen here, on one thread; PyMuPDF is not thread-safe
+        page_count = len(doc)
+        full_text = "".join(doc[page_num].get_text() for page_num in range(page_count))
+        page_texts = _references_page_texts(doc)
+        references_text = _references_full_text(page_texts)
+        first_page_text = _first_page_text(doc)
+        metadata = doc.metadata
+        robust_data = _empty_first_page_fields()
+        robust_data['metadata'] = _pdf_metadata(doc)
+        metadata_fields = None if force_ai else _first_page_fields_from_metadata(robust_data['metadata'], first_page_text)
+        if metadata_fields:
+            robust_data.update(metadata_fields)
         
-        # Open PDF with PyMuPDF using file path
-        doc = fitz.open(temp_file_path)
+        api_key = x_gemini_api_key or GEMINI_API_KEY
+        use_cache = not _no_cache(x_no_cache)
+        text_sample = None
+        if api_key and len(references_text) > 1000:  # Only use AI for substantial papers
+            text_sample = _references_text_sample(references_text, page_texts)
+        
+        # Only the network-bound Gemini requests run in worker threads
+        first_page_fields, ai_references = await asyncio.gather(
+            asyncio.to_thread(first_page_fields_with_gemini, first_page_text, api_key, use_cache)
+            if first_page_text and not metadata_fields else asyncio.sleep(0, {}),
+            asyncio.to_thread(_gemini_references_from_sample, text_sample, api_key, use_cache)
+            if text_sample else asyncio.sleep(0, []),
+            return_exceptions=True
+        )
+        if isinstance(first_page_fields, Exception):
+            logger.error(f"Gemini AI extraction failed: {first_page_fields}")
+            first_page_fields = {}
+        if isinstance(ai_references, Exception):
+            logger.warning(f"AI reference extraction failed: {ai_references}, falling back to regex extraction")
+            ai_references = []
+        robust_data.update(first_page_fields)
+        
+        references = _accepted_ai_references(ai_references) if text_sample else []
+        if not references:
+            references = extract_references_from_text(_regex_references_section(references_text))
+            logger.info(f"Extracted {len(references)} references using regex")
         
+        return DocumentExtractionResponse(
+            text=full_text,
+            pages=page_count,
+            metadata=_combined_metadata(robust_data, metadata),
+            references=references,
+            count=len(references)
+        )
+    except Exception as e:
+        logger.error(f"Error extracting document: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error extracting document: {str(e)}")
+    finally:
+        if doc:
+            doc.close()
+
+def _write_figure_image(image_bytes: bytes, image_path: Path):
+    with open(image_path, "wb") as img_file:
+        img_file.write(image_bytes)
+
+def _figure_phash(image_bytes: bytes) -> Optional[str]:
+    """
+    Perceptual hash of an extracted image (None if it cannot be decoded), cached by
+    the image's SHA-1. Uses no PyMuPDF objects, so it is safe to run in a worker thread.
+    """
+    # Imaging stack is only needed here; keep it off the service's import path
+    import io
+    import imagehash
+    from PIL import Image
+    
+    image_key = hashlib.sha1(image_bytes).hexdigest()
+    cached = figure_hash_cache.get(image_key)
+    if cached is not None:
+        return cached['phash']
+    
+    # Generate perceptual hash
+    try:
+        pil_image = Image.open(io.BytesIO(image_bytes))
+        phash = str(imagehash.phash(pil_image))
+    except Exception as e:
+        logger.warning(f"Could not generate hash for image: {e}")
+        phash = None
+    # Decode failures are not cached, so they are retried on the next extraction
+    if phash is not None:
+        figure_hash_cache.set(image_key, {'phash': phash})
+    return phash
+
+# Figure extraction runs in worker processes: each one decodes its own PDF, so
+# concurrent uploads do not share PyMuPDF state or block the event loop
+FIGURES_MAX_WORKERS = int(os.getenv("FIGURES_MAX_WORKERS", str(os.cpu_count() or 1)))
+_FIGURES_START_METHOD = "forkserver" if "forkserver" in multiprocessing.get_all_start_methods() else "spawn"
+_figures_pool: Optional[ProcessPoolExecutor] = None
+_figures_pool_lock = threading.Lock()
+
+def _get_figures_pool() -> ProcessPoolExecutor:
+    global _figures_pool
+    with _figures_pool_lock:
+        if _figures_pool is None:
+            # Workers must not be forked from this multithreaded server: a lock held by
+            # another thread at fork time (logging, caches, to_thread workers) would
+            # deadlock the child
+            _figures_pool = ProcessPoolExecutor(
+                max_workers=FIGURES_MAX_WORKERS, mp_context=multiprocessing.get_context(_FIGURES_START_METHOD)
+            )
+        return _figures_pool
+
+# Threads that write and hash figures inside a worker process; kept for the process's lifetime
+_figure_io_pool: Optional[ThreadPoolExecutor] = None
+
+def _get_figure_io_pool() -> ThreadPoolExecutor:
+    global _figure_io_pool
+    if _figure_io_pool is None:
+        _figure_io_pool = ThreadPoolExecutor(thread_name_prefix="figure-io")
+    return _figure_io_pool
+
+def _discard_figures_pool(pool: ProcessPoolExecutor):
+    """Drop a pool whose worker died so the next request starts a new one"""
+    global _figures_pool
+    with _figures_pool_lock:
+        if _figures_pool is pool:
+            _figures_pool = None
+    pool.shutdown(wait=False)
+
+# With dedupe, a figure whose pHash is within this Hamming distance of an earlier one is dropped
+FIGURE_DEDUPE_MAX_DISTANCE = 2
+
+def _extract_figures_from_pdf(content: bytes, filename: Optional[str], dedupe: bool = False) -> List[Figure]:
+    """
+    Body of /extract-figures, run in a worker process.
+    Images are read from the PDF on this thread (PyMuPDF is not thread-safe); writing
+    and hashing them runs in a thread pool. An image used on several pages is read
+    and hashed once. With dedupe, near-identical figures (repeated logos and page
+    decorations) are only reported the first time.
+    """
+    doc = fitz.open(stream=content, filetype="pdf")
+    try:
         figures = []
-        figure_counter = 0
+        kept_hashes = []  # perceptual hashes of the figures so far, as ints, for dedupe
         
         # Create figures directory for this PDF
-        pdf_id = file.filename.replace(".pdf", "").replace(" ", "_") if file.filename else "unknown"
+        pdf_id = filename.replace(".pdf", "").replace(" ", "_") if filename else "unknown"
         figures_dir = UPLOADS_DIR / "figures" / pdf_id
         figures_dir.mkdir(parents=True, exist_ok=True)
         
+        # Shared with later requests in this process, so it is not shut down here
+        executor = _get_figure_io_pool()
+        pending = []  # (page_num, img_idx, image_path, base_image, write, phash) futures in document order
+        images_by_xref = {}  # xref -> (base_image, phash future)
         page_count = len(doc)
         for page_num in range(page_count):
-            page = doc[page_num]
-            
-            # Get images on this page
-            image_list = page.get_images()
+            # Get images on this page; unlike page.get_images() this reads the page's
+            # resources without loading a Page object
+            image_list = doc.get_page_images(page_num)
             
             for img_idx, img in enumerate(image_list):
                 try:
                     # Get image data
                     xref = img[0]
-                    base_image = doc.extract_image(xref)
+                    if xref not in images_by_xref:
+                        base_image = doc.extract_image(xref)
+                        images_by_xref[xref] = (base_image, executor.submit(_figure_phash, base_image["image"]))
+                    base_image, phash_future = images_by_xref[xref]
                     image_bytes = base_image["image"]
                     image_ext = base_image["ext"]
                     
-                    # Save image
+                    # Save image in the pool
                     image_filename = f"page_{page_num+1}_img_{img_idx+1}.{image_ext}"
                     image_path = figures_dir / image_filename
-                    
-                    with open(image_path, "wb") as img_file:
-                        img_file.write(image_bytes)
-                    
-                    # Generate perceptual hash
-                    try:
-                        pil_image = Image.open(io.BytesIO(image_bytes))
-                        phash = str(imagehash.phash(pil_image))
-                    except Exception as e:
-                        logger.warning(f"Could not generate hash for image: {e}")
-                        phash = None
-                    
-                    # Get image dimensions
-                    width = base_image.get("width")
-                    height = base_image.get("height")
-                    
-                    # Try to find caption (look for "Figure X" or "Fig. X" near the image)
-                    caption = None
-                    # This is a simplified approach - can be enhanced
-                    
-                    figure = Figure(
-                        order=figure_counter + 1,
-                        page_number=page_num + 1,
-                        image_path=str(image_path.relative_to(UPLOADS_DIR)),
-                        perceptual_hash=phash,
-                        width=width,
-                        height=height,
-                        caption=caption
-                    )
-                    
-                    figures.append(figure)
-                    figure_counter += 1
-                    
+                    write_future = executor.submit(_write_figure_image, image_bytes, image_path)
+                    pending.append((page_num, img_idx, image_path, base_image, write_future, phash_future))
                 except Exception as e:
                     logger.warning(f"Error processing image {img_idx} on page {page_num}: {e}")
                     continue
         
+        for page_num, img_idx, image_path, base_image, write_future, phash_future in pending:
+            try:
+                write_future.result()
+                phash = phash_future.result()
+            except Exception as e:
+                logger.warning(f"Error processing image {img_idx} on page {page_num}: {e}")
+                continue
+            
+            if dedupe and phash:
+                phash_int = int(phash, 16)
+                if any(bin(phash_int ^ kept).count('1') <= FIGURE_DEDUPE_MAX_DISTANCE for kept in kept_hashes):
+                    image_path.unlink(missing_ok=True)
+                    continue
+                kept_hashes.append(phash_int)
+            
+            # Try to find caption (look for "Figure X" or "Fig. X" near the image)
+            caption = None
+            # This is a simplified approach - can be enhanced
+            
+            figures.append(Figure(
+                order=len(figures) + 1,
+                page_number=page_num + 1,
+                image_path=str(image_path.relative_to(UPLOADS_DIR)),
+                perceptual_hash=phash,
+                width=base_image.get("width"),
+                height=base_image.get("height"),
+                caption=caption
+            ))
+    
+        return figures
+    finally:
+        doc.close()
+
+@app.on_event("shutdown")
+def _shutdown_figures_pool():
+    global _figures_pool
+    with _figures_pool_lock:
+        pool, _figures_pool = _figures_pool, None
+    if pool is not None:
+        pool.shutdown(wait=False, cancel_futures=True)
+
+@app.post("/extract-figures", response_model=FigureExtractionResponse)
+async def extract_figures(file: UploadFile = File(...), dedupe: bool = False):
+    """
+    Extract figures/images from PDF file and generate perceptual hashes.
+    The extraction runs in a worker process (see _extract_figures_from_pdf).
+    Pass ?dedupe=true to drop figures that repeat an earlier one (pHash distance <= 2).
+    """
+    try:
+        content = await _read_upload(file)
+        pool = _get_figures_pool()
+        try:
+            figures = await asyncio.get_running_loop().run_in_executor(
+                pool, _extract_figures_from_pdf, content, file.filename, dedupe
+            )
+        except BrokenProcessPool:
+            _discard_figures_pool(pool)
+            raise
+        
         return FigureExtractionResponse(
             figures=figures,
             count=len(figures)
@@ -1469,19 +2469,8 @@ async def extract_figures(file: UploadFile = File(...)):
     except Exception as e:
         logger.error(f"Error extracting figures: {str(e)}")
         raise HTTPException(status_code=500, detail=f"Error extracting figures: {str(e)}")
-    finally:
-        if doc:
-            doc.close()
-        # Clean up temporary file
-        if temp_file_path and os.path.exists(temp_file_path):
-            try:
-                os.unlink(temp_file_path)
-            except Exception as e:
-                logger.warning(f"Failed to delete temp file: {e}")
 
 from content_checker import ContentChecker
-from pydantic import BaseModel
-from typing import List
 
 class ContentValidationRequest(BaseModel):
     text: str
@@ -1495,12 +2484,26 @@ async def validate_content(request: ContentValidationRequest):
     results = []
     
     # 1. Validate References
+    # One pass over the text for citations, figure callouts and the reference heading;
+    # each reference is then a set lookup
+    scan = ContentChecker.scan_document(request.text)
+    citation_index = scan['citations']
+    # Search author names only in the body so the reference list itself never counts
+    body_text = scan['body'] if scan['references'] else None
+    # Count all candidate author names in a single scan for the name fallback
+    author_counts = ContentChecker.build_author_counts(
+        body_text if body_text is not None else request.text,
+        [ref.normalized_authors or ref.raw_text for ref in request.references]
+    )
     for ref in request.references:
         # Check if reference is cited
-        citation_check = ContentChecker.check_reference_citation(
-            request.text, 
+        citation_check = ContentChecker.check_reference_citation_indexed(
+            citation_index,
             ref.order, 
-            ref.normalized_authors or ref.raw_text
+            ref.normalized_authors or ref.raw_text,
+            request.text,
+            author_counts,
+            body_text
         )
         
         # Add result to reference object (or return separate results)
@@ -1511,7 +2514,10 @@ async def validate_content(request: ContentValidationRequest):
         })
         
     # 2. Validate Figures
-    figure_check = ContentChecker.check_figure_callouts(request.text)
+    if request.text:
+        figure_check = ContentChecker.summarize_figure_counts(scan['figure_counts'])
+    else:
+        figure_check = ContentChecker.check_figure_callouts(request.text)
     
     return {
         'reference_validation': results,
@@ -0,0 +1,102 @@
+"""
+Quick equivalence checks for ContentChecker's citation scan paths.
+Runs every available scan_document path (Hyperscan, compiled scanner, regex)
+on the same texts and compares the cited numbers with the expected ones.
+"""
+
+import content_checker
+from content_checker import ContentChecker
+
+# text -> reference numbers that must be found as cited
+CITATION_CASES = {
+    'as shown in [1] and [2, 3]': {1, 2, 3},
+    'see [4-6] and [8; 9]': {4, 5, 6, 8, 9},
+    'x in [0, 1) and see [4].': {4},
+    'half-open [a, b) interval as in [7]': {7},
+    'nested [[1]] citation': {1},
+    'no citation [] here [unclosed': set(),
+    'Fig. 1 shows [2] (dataset from [10])': {2, 10},
+    'values 0, 1, 2, 3 and the tuple (3,1,4)': set(),
+}
+
+# (text, author strings) -> expected whole-word count per candidate name
+AUTHOR_COUNT_CASES = [
+    ('Smith-Jones (2020) and Smith-Jones et al.', ['Smith, J.', 'Smith-Jones, A.'],
+     {'Smith': 2, 'Smith-Jones': 2}),
+    ('Smithson cites Smith and Jones', ['Smith, J.', 'Jones, B.'],
+     {'Smith': 1, 'Jones': 1}),
+]
+
+# Reference numbers compared against check_reference_citation
+MAX_CHECKED_REFERENCE = 20
+
+
+def _scan_paths():
+    """Yields (name, HYPERSCAN_AVAILABLE, CONTENT_SCANNER_AVAILABLE) for each usable path."""
+    if content_checker.HYPERSCAN_AVAILABLE:
+        yield 'hyperscan', True, content_checker.CONTENT_SCANNER_AVAILABLE
+    if content_checker.CONTENT_SCANNER_AVAILABLE:
+        yield 'compiled scanner', False, True
+    yield 'regex', False, False
+
+
+def test_citation_scan_paths():
+    """Every scan path finds the expected citations"""
+    hyperscan_available = content_checker.HYPERSCAN_AVAILABLE
+    scanner_available = content_checker.CONTENT_SCANNER_AVAILABLE
+    passed = True
+
+    try:
+        for name, use_hyperscan, use_scanner in _scan_paths():
+            content_checker.HYPERSCAN_AVAILABLE = use_hyperscan
+            content_checker.CONTENT_SCANNER_AVAILABLE = use_scanner
+            for text, expected in CITATION_CASES.items():
+                citations = ContentChecker.scan_document(text)['citations']
+                if citations != expected:
+                    print(f"❌ {name}: {text!r} -> {sorted(citations)}, expected {sorted(expected)}")
+                    passed = False
+            print(f"✅ {name} path checked")
+    finally:
+        content_checker.HYPERSCAN_AVAILABLE = hyperscan_available
+        content_checker.CONTENT_SCANNER_AVAILABLE = scanner_available
+
+    # The index must find everything the per-reference check it replaces finds
+    for text, expected in CITATION_CASES.items():
+        index = ContentChecker.build_citation_index(text)
+        for n in range(1, MAX_CHECKED_REFERENCE + 1):
+            if ContentChecker.check_reference_citation(text, n)['valid'] and n not in index:
+                print(f"❌ build_citation_index misses [{n}] in {text!r}")
+                passed = False
+        if index != expected:
+            print(f"❌ build_citation_index: {text!r} -> {sorted(index)}, expected {sorted(expected)}")
+            passed = False
+
+    return passed
+
+
+def test_author_count_paths():
+    """Aho-Corasick and regex author counts agree, including overlapping names"""
+    ahocorasick_available = content_checker.AHOCORASICK_AVAILABLE
+    paths = [('aho-corasick', True)] if ahocorasick_available else []
+    paths.append(('regex', False))
+    passed = True
+
+    try:
+        for name, use_ahocorasick in paths:
+            content_checker.AHOCORASICK_AVAILABLE = use_ahocorasick
+            for text, author_strings, expected in AUTHOR_COUNT_CASES:
+                counts = ContentChecker.build_author_counts(text, author_strings)
+                if counts != expected:
+                    print(f"❌ {name}: {text!r} -> {counts}, expected {expected}")
+                    passed = False
+            print(f"✅ {name} author counts checked")
+    finally:
+        content_checker.AHOCORASICK_AVAILABLE = ahocorasick_available
+
+    return passed
+
+
+if __name__ == "__main__":
+    passed = test_citation_scan_paths()
+    passed = test_author_count_paths() and passed
+    print("✅ All checks passed" if passed else "❌ Some checks failed")
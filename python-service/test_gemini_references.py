@@ -0,0 +1,142 @@
+"""
+Quick checks for the Gemini references helpers in main.py that run without an API key:
+the streamed JSON array reader, the references text splitter, and the re-request of a
+reply cut off at max_output_tokens (with _generate_with_gemini stubbed out).
+"""
+
+import json
+import re
+import tempfile
+from pathlib import Path
+from types import SimpleNamespace
+
+import main
+from main import ResultCache, _JsonArrayStream, _split_text_pieces
+
+STREAM_OBJECTS = [
+    {'title': 'Braces } and ] and {', 'authors': 'A. "Quoted" Author', 'year': 2020},
+    {'title': 'Escaped \\ backslash', 'nested': {'pages': [1, 2]}, 'year': None},
+]
+STREAM_REPLY = '```json\n' + json.dumps({'references': STREAM_OBJECTS}, indent=2) + '\n```'
+
+SPLIT_TEXTS = [
+    "[1] First reference.\n\n[2] Second reference\nwraps onto a second line.\n\n[3] Third.\n",
+    "one line without any breaks that is longer than the smaller budgets",
+    "a\nbb\nccc\n\n\ndddd\neeeee\n",
+]
+SPLIT_MAX_CHARS = (1, 5, 17, 40, 1000)
+
+# Numbered entries whose titles the stub reads back out of the prompt
+ENTRY_RE = re.compile(r'^\[(\d+)\] (Paper \w+)$', re.MULTILINE)
+REFERENCES_TEXT = "".join(f"[{n}] Paper {word}\n" for n, word in enumerate(['alpha', 'beta', 'gamma', 'delta'], 1))
+
+
+def _feed_by_char(text):
+    stream = _JsonArrayStream('references')
+    objects = []
+    for char in text:
+        objects.extend(stream.feed(char))
+    return objects, stream.complete
+
+
+def test_json_array_stream():
+    """Objects come out whole when fed one character at a time; a cut reply is incomplete"""
+    passed = True
+
+    objects, complete = _feed_by_char(STREAM_REPLY)
+    if objects != STREAM_OBJECTS or not complete:
+        print(f"❌ full reply -> {objects}, complete={complete}")
+        passed = False
+
+    # Cut inside the second object: only the first one is complete
+    truncated = STREAM_REPLY[:STREAM_REPLY.index('Escaped') + 5]
+    objects, complete = _feed_by_char(truncated)
+    if objects != STREAM_OBJECTS[:1] or complete:
+        print(f"❌ truncated reply -> {objects}, complete={complete}")
+        passed = False
+
+    print("✅ _JsonArrayStream checked")
+    return passed
+
+
+def test_split_text_pieces():
+    """Pieces join back to the text and none is longer than max_chars"""
+    passed = True
+    for text in SPLIT_TEXTS:
+        for max_chars in SPLIT_MAX_CHARS:
+            pieces = _split_text_pieces(text, max_chars)
+            if "".join(pieces) != text or any(len(piece) > max_chars for piece in pieces):
+                print(f"❌ {text!r} at {max_chars} chars -> {pieces}")
+                passed = False
+    print("✅ _split_text_pieces checked")
+    return passed
+
+
+def _stub_reply(prompt, failing_title=None):
+    """Full JSON reply for up to two entries, a MAX_TOKENS cut-off reply for more"""
+    entries = ENTRY_RE.findall(prompt)
+    if len(entries) <= 2 and any(title == failing_title for _, title in entries):
+        return None
+    text = json.dumps({'references': [{'title': title, 'authors': 'A. Author', 'year': 2020} for _, title in entries]})
+    if len(entries) <= 2:
+        return SimpleNamespace(text=text, candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name='STOP'))])
+    # Cut after the first object, as a reply stopped at max_output_tokens would be
+    cut = text.index('}') + 10
+    return SimpleNamespace(text=text[:cut], candidates=[SimpleNamespace(finish_reason=SimpleNamespace(name='MAX_TOKENS'))])
+
+
+def test_truncated_reply_is_split():
+    """A MAX_TOKENS reply is re-requested in halves; only complete lists are cached"""
+    generate = main._generate_with_gemini
+    configure = main.configure_gemini
+    cache = main.gemini_cache
+    passed = True
+
+    try:
+        main.configure_gemini = lambda key: None
+        for failing_title in (None, 'Paper delta'):
+            requested = []
+
+            def fake_generate(prompt, generation_config):
+                requested.append([title for _, title in ENTRY_RE.findall(prompt)])
+                return _stub_reply(prompt, failing_title)
+
+            main._generate_with_gemini = fake_generate
+            with tempfile.TemporaryDirectory() as cache_dir:
+                main.gemini_cache = ResultCache(cache_dir=Path(cache_dir))
+                data, complete = main._gemini_reference_data_from_chunk(REFERENCES_TEXT, 'test-key')
+                titles = [ref['title'] for ref in data]
+                whole_cached = main.gemini_cache.get(main._references_cache_key(REFERENCES_TEXT)) is not None
+                main.gemini_cache._conn.close()
+
+            expected_requests = [
+                ['Paper alpha', 'Paper beta', 'Paper gamma', 'Paper delta'],
+                ['Paper alpha', 'Paper beta'],
+                ['Paper gamma', 'Paper delta'],
+            ]
+            if requested != expected_requests:
+                print(f"❌ failing={failing_title}: requested {requested}")
+                passed = False
+
+            if failing_title is None:
+                ok = complete and whole_cached and titles == expected_requests[0]
+            else:
+                # The failed half is missing, so the list is incomplete and not cached
+                ok = not complete and not whole_cached and titles == expected_requests[1]
+            if not ok:
+                print(f"❌ failing={failing_title}: titles={titles}, complete={complete}, cached={whole_cached}")
+                passed = False
+        print("✅ truncated reply re-request checked")
+    finally:
+        main._generate_with_gemini = generate
+        main.configure_gemini = configure
+        main.gemini_cache = cache
+
+    return passed
+
+
+if __name__ == "__main__":
+    passed = test_json_array_stream()
+    passed = test_split_text_pieces() and passed
+    passed = test_truncated_reply_is_split() and passed
+    print("✅ All checks passed" if passed else "❌ Some checks failed")
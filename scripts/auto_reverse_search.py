@@ -3,10 +3,14 @@ Automated Reverse Image Search using Selenium
 Supports Google Images and Bing Visual Search with anti-detection techniques.
 """
 
+import os
 import sys
 import json
 import argparse
+import socket
+import socketserver
 import time
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from typing import Dict, Optional, List
 from selenium import webdriver
@@ -15,7 +19,7 @@ from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.chrome.service import Service
 from selenium.webdriver.chrome.options import Options
-from selenium.common.exceptions import TimeoutException, NoSuchElementException
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
 import logging
 
 # Try to import webdriver-manager for automatic ChromeDriver management
@@ -28,6 +32,23 @@ except ImportError:
     ChromeDriverManager = None
     ChromeService = None
 
+# A --daemon process keeps one browser open and serves searches on this socket
+# (only its owner may connect; the per-user runtime dir is preferred over /tmp)
+DAEMON_SOCKET_PATH = os.getenv(
+    "REVERSE_SEARCH_SOCKET",
+    os.path.join(os.getenv("XDG_RUNTIME_DIR") or "/tmp", "rev_search.sock")
+)
+# Client waits this long to connect, then this long per image for the reply,
+# before searching locally instead
+DAEMON_CONNECT_TIMEOUT = 5.0
+DAEMON_TIMEOUT_PER_IMAGE = 60.0
+# Files the daemon agrees to upload
+IMAGE_EXTENSIONS = frozenset({'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.tif', '.tiff'})
+
+# ChromeDriverManager().install() checks versions over the network; its result is reused for a week
+CHROMEDRIVER_CACHE_FILE = Path.home() / ".cache" / "scholarsentinel" / "chromedriver"
+CHROMEDRIVER_CACHE_MAX_AGE = 7 * 24 * 3600
+
 # Configure logging
 logging.basicConfig(
     level=logging.INFO,
@@ -36,6 +57,42 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 
+def _chromedriver_path() -> str:
+    """ChromeDriver installed by webdriver-manager, from the local cache when it is recent"""
+    try:
+        if time.time() - CHROMEDRIVER_CACHE_FILE.stat().st_mtime < CHROMEDRIVER_CACHE_MAX_AGE:
+            cached_path = CHROMEDRIVER_CACHE_FILE.read_text().strip()
+            if cached_path and Path(cached_path).exists():
+                return cached_path
+    except OSError:
+        pass
+    
+    driver_path = ChromeDriverManager().install()
+    try:
+        CHROMEDRIVER_CACHE_FILE.parent.mkdir(parents=True, exist_ok=True)
+        CHROMEDRIVER_CACHE_FILE.write_text(driver_path)
+    except OSError as e:
+        logger.warning(f"Could not cache ChromeDriver path: {e}")
+    return driver_path
+
+
+def _has_external_link(driver, own_domain: str) -> bool:
+    """True once the page links somewhere outside own_domain (a matching page)."""
+    for link in driver.find_elements(By.CSS_SELECTOR, 'a[href*="http"]'):
+        href = link.get_attribute('href')
+        if href and own_domain not in href:
+            return True
+    return False
+
+
+def _google_results_ready(driver) -> bool:
+    return _has_external_link(driver, 'google.com')
+
+
+def _bing_results_ready(driver) -> bool:
+    return bool(driver.find_elements(By.CSS_SELECTOR, '.b_rich')) or _has_external_link(driver, 'bing.com')
+
+
 class ReverseImageSearcher:
     """Automated reverse image search using Selenium"""
     
@@ -50,6 +107,8 @@ class ReverseImageSearcher:
         self.headless = headless
         self.driver_path = driver_path
         self.driver = None
+        # Second browser for Bing in search_batch(engine='both'), kept between batches
+        self._bing_searcher: Optional['ReverseImageSearcher'] = None
     
     def _setup_driver(self):
         """Setup Chrome WebDriver with anti-detection options"""
@@ -81,7 +140,7 @@ class ReverseImageSearcher:
         elif WEBDRIVER_MANAGER_AVAILABLE:
             # Use webdriver-manager to automatically download and manage ChromeDriver
             try:
-                service = ChromeService(ChromeDriverManager().install())
+                service = ChromeService(_chromedriver_path())
                 self.driver = webdriver.Chrome(service=service, options=chrome_options)
                 logger.info("Using webdriver-manager for ChromeDriver")
             except Exception as e:
@@ -107,6 +166,23 @@ class ReverseImageSearcher:
         delay = random.uniform(min_seconds, max_seconds)
         time.sleep(delay)
     
+    def _wait_for_results(self, upload_url: str, results_ready, timeout: float = 8.0):
+        """
+        Wait until the results for an uploaded image have rendered: the browser
+        navigates away from upload_url and results_ready(driver) returns True,
+        for at most timeout seconds.
+        """
+        deadline = time.time() + timeout
+        try:
+            WebDriverWait(self.driver, timeout).until(EC.url_changes(upload_url))
+            WebDriverWait(
+                self.driver,
+                max(0.1, deadline - time.time()),
+                ignored_exceptions=(NoSuchElementException, StaleElementReferenceException)
+            ).until(results_ready)
+        except TimeoutException:
+            logger.warning(f"No results rendered within {timeout:.0f}s, extracting what is there")
+    
     def search_google(self, image_path: str) -> Dict[str, any]:
         """
         Perform reverse image search on Google Images.
@@ -145,6 +221,7 @@ class ReverseImageSearcher:
                     self._throttle(2, 3)
             
             # Upload image
+            upload_url = self.driver.current_url
             try:
                 file_input = WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located((By.CSS_SELECTOR, 'input[type="file"]'))
@@ -159,8 +236,8 @@ class ReverseImageSearcher:
                 except:
                     raise Exception("Could not find file input element")
             
-            # Wait for results (5-8 seconds)
-            self._throttle(5, 8)
+            # Wait for results (up to 8 seconds)
+            self._wait_for_results(upload_url, _google_results_ready)
             
             # Extract results
             results = {
@@ -255,6 +332,7 @@ class ReverseImageSearcher:
                     raise Exception("Could not find Bing camera button")
             
             # Upload image
+            upload_url = self.driver.current_url
             try:
                 file_input = WebDriverWait(self.driver, 10).until(
                     EC.presence_of_element_located((By.ID, 'sb_file'))
@@ -264,8 +342,8 @@ class ReverseImageSearcher:
             except TimeoutException:
                 raise Exception("Could not find Bing file input element")
             
-            # Wait for results (5-8 seconds)
-            self._throttle(5, 8)
+            # Wait for results (up to 8 seconds)
+            self._wait_for_results(upload_url, _bing_results_ready)
             
             # Extract results
             results = {
@@ -322,19 +400,136 @@ class ReverseImageSearcher:
                 'resultUrl': self.driver.current_url if self.driver else None
             }
     
+    def search_batch(self, image_paths: List[str], engine: str = 'google') -> List[Dict[str, any]]:
+        """
+        Reverse image search for several images with one browser session.
+        
+        Args:
+            image_paths: Paths to image files
+            engine: 'google', 'bing' or 'both'
+        
+        Returns:
+            One dictionary per image, in order, keyed by search engine
+        """
+        if engine != 'both':
+            search = self.search_google if engine == 'google' else self.search_bing
+            return [{engine: search(image_path)} for image_path in image_paths]
+        
+        # Both engines: Bing gets a second browser so the two run side by side.
+        # Each thread only touches its own driver; Selenium calls mostly wait on I/O.
+        if self._bing_searcher is None:
+            self._bing_searcher = ReverseImageSearcher(headless=self.headless, driver_path=self.driver_path)
+        bing_searcher = self._bing_searcher
+        with ThreadPoolExecutor(max_workers=2) as executor:
+            google_results = executor.submit(lambda: [self.search_google(p) for p in image_paths])
+            bing_results = executor.submit(lambda: [bing_searcher.search_bing(p) for p in image_paths])
+            return [
+                {'google': google, 'bing': bing}
+                for google, bing in zip(google_results.result(), bing_results.result())
+            ]
+    
     def close(self):
-        """Close the browser"""
+        """Close the browser (and the Bing one opened by search_batch)"""
+        if self._bing_searcher:
+            self._bing_searcher.close()
+            self._bing_searcher = None
         if self.driver:
             self.driver.quit()
             self.driver = None
 
 
+def serve_daemon(searcher: ReverseImageSearcher, socket_path: str = DAEMON_SOCKET_PATH):
+    """
+    Serve searches with one long-lived browser on a Unix socket.
+    Each connection sends one JSON line {"image_paths": [...], "engine": ...} and
+    gets one JSON line back: the search_batch result, or {"error": ...}.
+    Requests are handled one at a time, since they share the browser.
+    """
+    class SearchHandler(socketserver.StreamRequestHandler):
+        def handle(self):
+            line = self.rfile.readline()
+            if not line:
+                return  # connection probe, e.g. from a second daemon starting up
+            try:
+                request = json.loads(line)
+                image_paths = request['image_paths']
+                # Only image files are uploaded; symlinks are judged by their target
+                rejected = [
+                    p for p in image_paths
+                    if not Path(p).is_file() or Path(p).resolve().suffix.lower() not in IMAGE_EXTENSIONS
+                ]
+                if rejected:
+                    raise ValueError(f"Not an image file: {', '.join(rejected)}")
+                response = searcher.search_batch(image_paths, request.get('engine', 'google'))
+            except Exception as e:
+                logger.error(f"Daemon request failed: {e}")
+                response = {'error': str(e)}
+            self.wfile.write(json.dumps(response).encode('utf-8') + b'\n')
+    
+    if os.path.exists(socket_path):
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        probe.settimeout(DAEMON_CONNECT_TIMEOUT)
+        try:
+            probe.connect(socket_path)
+        except ConnectionRefusedError:
+            os.unlink(socket_path)  # left behind by a daemon that has exited
+        except FileNotFoundError:
+            pass
+        else:
+            raise RuntimeError(f"A reverse search daemon is already listening on {socket_path}")
+        finally:
+            probe.close()
+    # Create the socket owner-only from the start, so no other user can connect
+    old_umask = os.umask(0o177)
+    try:
+        server = socketserver.UnixStreamServer(socket_path, SearchHandler)
+    finally:
+        os.umask(old_umask)
+    os.chmod(socket_path, 0o600)
+    with server:
+        logger.info(f"Reverse search daemon listening on {socket_path}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(socket_path)
+
+
+def search_via_daemon(image_paths: List[str], engine: str,
+                      socket_path: str = DAEMON_SOCKET_PATH) -> Optional[List[Dict[str, any]]]:
+    """search_batch through a running daemon, or None if no daemon is listening or it times out"""
+    if not os.path.exists(socket_path):
+        return None
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.settimeout(DAEMON_CONNECT_TIMEOUT)
+            client.connect(socket_path)
+            # A busy or wedged daemon must not hang the CLI
+            client.settimeout(DAEMON_TIMEOUT_PER_IMAGE * len(image_paths))
+            request = {
+                # The daemon may run from another directory
+                'image_paths': [str(Path(p).absolute()) for p in image_paths],
+                'engine': engine,
+            }
+            client.sendall(json.dumps(request).encode('utf-8') + b'\n')
+            response = json.loads(client.makefile('rb').readline())
+    except (OSError, ValueError) as e:
+        logger.warning(f"Reverse search daemon not reachable, searching locally: {e}")
+        return None
+    if isinstance(response, dict) and 'error' in response:
+        raise Exception(response['error'])
+    return response
+
+
 def main():
     """CLI entry point"""
     parser = argparse.ArgumentParser(
         description="Automated reverse image search"
     )
-    parser.add_argument("image_path", help="Path to image file")
+    parser.add_argument(
+        "image_paths",
+        nargs='*',
+        help="Path to image file; with several paths, one browser session is used and a JSON list is printed"
+    )
     parser.add_argument(
         "--engine",
         choices=['google', 'bing', 'both'],
@@ -350,8 +545,15 @@ def main():
         "--driver-path",
         help="Path to ChromeDriver executable"
     )
+    parser.add_argument(
+        "--daemon",
+        action="store_true",
+        help=f"Keep a browser open and serve searches on {DAEMON_SOCKET_PATH} (REVERSE_SEARCH_SOCKET)"
+    )
     
     args = parser.parse_args()
+    if not args.daemon and not args.image_paths:
+        parser.error("at least one image path is required")
     
     searcher = ReverseImageSearcher(
         headless=args.headless,
@@ -359,14 +561,17 @@ def main():
     )
     
     try:
-        results = {}
-        
-        if args.engine in ['google', 'both']:
-            results['google'] = searcher.search_google(args.image_path)
+        if args.daemon:
+            serve_daemon(searcher)
+            sys.exit(0)
         
-        if args.engine in ['bing', 'both']:
-            results['bing'] = searcher.search_bing(args.image_path)
+        # Use the daemon's browser when one is running
+        batch_results = search_via_daemon(args.image_paths, args.engine)
+        if batch_results is None:
+            batch_results = searcher.search_batch(args.image_paths, args.engine)
         
+        # A single image keeps the original JSON object output
+        results = batch_results[0] if len(batch_results) == 1 else batch_results
         print(json.dumps(results, indent=2))
         
         sys.exit(0)
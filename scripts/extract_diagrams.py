@@ -8,6 +8,10 @@ import sys
 import json
 import os
 import argparse
+import shutil
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain
 from pathlib import Path
 from typing import List, Dict, Any, Optional, Tuple
 import fitz  # PyMuPDF
@@ -23,11 +27,41 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Pages are split across at most this many worker processes (PyMuPDF gains little beyond ~6)
+EXTRACT_MAX_WORKERS = min(os.cpu_count() or 1, 6)
+# Below this many pages, starting worker processes costs more than it saves
+PARALLEL_MIN_PAGES = 8
+# Default pHash size (256-bit hashes); stored hashes are only comparable at the same size
+DEFAULT_HASH_SIZE = 16
+# Modes whose direct grayscale conversion matches going through RGB first
+DIRECT_GRAYSCALE_MODES = frozenset({'RGB', 'L', 'LA', '1', 'P', 'PA', 'RGBA', 'RGBX', 'CMYK'})
+
+
+def _extract_pages_worker(
+    pdf_path: str, output_dir: str, job_id: str, page_nums: List[int], hash_size: int = DEFAULT_HASH_SIZE
+) -> List[Dict[str, Any]]:
+    """
+    Extract embedded images from page_nums in a worker process.
+    Each worker opens the PDF itself, since fitz.Document objects cannot be shared.
+    """
+    extractor = DiagramExtractor(pdf_path, output_dir, job_id, hash_size=hash_size)
+    doc = fitz.open(pdf_path)
+    try:
+        images = []
+        for page_num in page_nums:
+            images.extend(extractor._extract_embedded_images(doc, doc[page_num], page_num, 0))
+        return images
+    finally:
+        doc.close()
+
 
 class DiagramExtractor:
     """Extracts diagrams/images from PDFs and computes perceptual hashes"""
     
-    def __init__(self, pdf_path: str, output_dir: str, job_id: str):
+    def __init__(
+        self, pdf_path: str, output_dir: str, job_id: str, hash_size: int = DEFAULT_HASH_SIZE,
+        duplicate_max_distance: int = 0
+    ):
         """
         Initialize the diagram extractor.
         
@@ -35,11 +69,21 @@ class DiagramExtractor:
             pdf_path: Path to the input PDF file
             output_dir: Base directory for output (will create subdirectory for job_id)
             job_id: Unique identifier for this extraction job
+            hash_size: pHash size; 8 gives 64-bit hashes, which are cheaper to compute
+                but not comparable with hashes stored at the default size
+            duplicate_max_distance: Images whose hashes differ in at most this many bits
+                are grouped as duplicates (0 groups identical hashes only)
         """
         self.pdf_path = Path(pdf_path)
+        self.hash_size = hash_size
+        self.duplicate_max_distance = duplicate_max_distance
+        self.base_output_dir = output_dir
         self.job_id = job_id
         self.output_dir = Path(output_dir) / job_id
         self.output_dir.mkdir(parents=True, exist_ok=True)
+        # xref -> (first written path, ext, width, height, perceptual hash), so an image
+        # repeated across pages is extracted and decoded once and then copied
+        self._xref_files: Dict[int, Tuple[Path, str, int, int, str]] = {}
         
         if not self.pdf_path.exists():
             raise FileNotFoundError(f"PDF file not found: {pdf_path}")
@@ -109,19 +153,38 @@ class DiagramExtractor:
             else:
                 logger.info(f"Processing PDF with {page_count} pages (starting from page 2, no references section detected)")
             
-            image_counter = 0
-            
             # Start from page 2 (index 1), skip first page, stop at references page (don't process references)
-            for page_num in range(1, last_page):
-                page = doc[page_num]
-                
-                # Method 1: Extract embedded images only
-                # No rendered pages - only embedded images
-                embedded_images = self._extract_embedded_images(
-                    doc, page, page_num, image_counter
-                )
-                images.extend(embedded_images)
-                image_counter += len(embedded_images)
+            page_nums = list(range(1, last_page))
+            workers = min(EXTRACT_MAX_WORKERS, len(page_nums))
+            
+            if workers > 1 and len(page_nums) >= PARALLEL_MIN_PAGES:
+                # Pages are independent: each worker takes a contiguous slice, and the slices
+                # are joined back in page order
+                slice_size = -(-len(page_nums) // workers)
+                slices = [page_nums[start:start + slice_size] for start in range(0, len(page_nums), slice_size)]
+                logger.info(f"Extracting {len(page_nums)} pages with {len(slices)} worker processes")
+                with ProcessPoolExecutor(max_workers=len(slices)) as executor:
+                    results = executor.map(
+                        _extract_pages_worker,
+                        [str(self.pdf_path)] * len(slices),
+                        [self.base_output_dir] * len(slices),
+                        [self.job_id] * len(slices),
+                        slices,
+                        [self.hash_size] * len(slices)
+                    )
+                    images.extend(chain.from_iterable(results))
+            else:
+                image_counter = 0
+                for page_num in page_nums:
+                    page = doc[page_num]
+                    
+                    # Method 1: Extract embedded images only
+                    # No rendered pages - only embedded images
+                    embedded_images = self._extract_embedded_images(
+                        doc, page, page_num, image_counter
+                    )
+                    images.extend(embedded_images)
+                    image_counter += len(embedded_images)
             
             logger.info(f"Extracted {len(images)} total images/diagrams")
             return images
@@ -145,8 +208,12 @@ class DiagramExtractor:
             
             for img_idx, img in enumerate(image_list):
                 try:
-                    # Extract image data
                     xref = img[0]
+                    if xref in self._xref_files:
+                        images.append(self._copy_repeated_image(xref, page_num, img_idx))
+                        continue
+                    
+                    # Extract image data
                     base_image = doc.extract_image(xref)
                     image_bytes = base_image["image"]
                     image_ext = base_image.get("ext", "png").lower()
@@ -179,6 +246,7 @@ class DiagramExtractor:
                     
                     # Compute perceptual hash
                     phash = self._compute_perceptual_hash(image_bytes)
+                    self._xref_files[xref] = (image_path, image_ext, width, height, phash)
                     
                     images.append({
                         "filename": filename,
@@ -201,6 +269,24 @@ class DiagramExtractor:
         
         return images
     
+    def _copy_repeated_image(self, xref: int, page_num: int, img_idx: int) -> Dict[str, Any]:
+        """Record another reference to an already written image by copying its file"""
+        first_path, image_ext, width, height, phash = self._xref_files[xref]
+        filename = f"page_{page_num + 1}_img_{img_idx + 1}.{image_ext}"
+        image_path = self.output_dir / filename
+        shutil.copyfile(first_path, image_path)
+        
+        logger.debug(f"Copied repeated embedded image: {filename} ({width}x{height})")
+        return {
+            "filename": filename,
+            "path": str(image_path),
+            "hash": phash,
+            "page": page_num + 1,
+            "width": width,
+            "height": height,
+            "type": "embedded"
+        }
+    
     def _render_page_as_image(
         self, page: fitz.Page, page_num: int, counter: int
     ) -> Optional[Dict[str, Any]]:
@@ -261,13 +347,14 @@ class DiagramExtractor:
     def _compute_perceptual_hash_from_pil(self, pil_image: Image.Image) -> str:
         """Compute perceptual hash from PIL Image"""
         try:
-            # Convert to RGB if necessary
-            if pil_image.mode != 'RGB':
+            # Convert to RGB if necessary. phash grayscales the image itself, so
+            # modes that grayscale the same way as via RGB go in as-is
+            if pil_image.mode not in DIRECT_GRAYSCALE_MODES:
                 pil_image = pil_image.convert('RGB')
             
             # Compute perceptual hash (pHash)
-            # Using hash_size=16 for good balance between accuracy and performance
-            phash = imagehash.phash(pil_image, hash_size=16)
+            # hash_size=16 by default for good balance between accuracy and performance
+            phash = imagehash.phash(pil_image, hash_size=self.hash_size)
             return str(phash)
         except Exception as e:
             logger.warning(f"Error computing perceptual hash: {e}")
@@ -282,33 +369,61 @@ class DiagramExtractor:
             
         Returns:
             List of duplicate groups, each containing hash and list of filenames
+            (the hash of the group's first image when near-duplicates are grouped)
         """
         # Group images by hash
-        hash_groups: Dict[str, List[str]] = {}
+        hash_groups: Dict[str, List[str]] = defaultdict(list)
         
         for img in images:
             hash_value = img.get("hash", "")
-            if not hash_value:
-                continue
-            
-            filename = img.get("filename", "")
-            if hash_value not in hash_groups:
-                hash_groups[hash_value] = []
-            hash_groups[hash_value].append(filename)
+            if hash_value:
+                hash_groups[hash_value].append(img.get("filename", ""))
+        
+        if self.duplicate_max_distance > 0:
+            hash_groups = self._merge_near_duplicates(hash_groups)
         
         # Find duplicates (hashes with more than one image)
-        duplicates = []
-        for hash_value, filenames in hash_groups.items():
-            if len(filenames) > 1:
-                duplicates.append({
-                    "hash": hash_value,
-                    "files": filenames,
-                    "count": len(filenames)
-                })
+        duplicates = [
+            {
+                "hash": hash_value,
+                "files": filenames,
+                "count": len(filenames)
+            }
+            for hash_value, filenames in hash_groups.items()
+            if len(filenames) > 1
+        ]
         
         logger.info(f"Found {len(duplicates)} duplicate groups")
         return duplicates
     
+    def _merge_near_duplicates(self, hash_groups: Dict[str, List[str]]) -> Dict[str, List[str]]:
+        """
+        Merge exact-hash groups whose hashes are within duplicate_max_distance bits,
+        transitively (union-find). Groups keep first-seen order.
+        """
+        hashes = list(hash_groups)
+        values = [int(hash_value, 16) for hash_value in hashes]
+        parent = list(range(len(hashes)))
+        
+        def find(i: int) -> int:
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+        
+        for i in range(len(values)):
+            for j in range(i + 1, len(values)):
+                if bin(values[i] ^ values[j]).count('1') <= self.duplicate_max_distance:
+                    root_i, root_j = find(i), find(j)
+                    if root_i != root_j:
+                        # The earlier group stays the root, so its hash names the merged group
+                        parent[max(root_i, root_j)] = min(root_i, root_j)
+        
+        merged: Dict[str, List[str]] = {}
+        for i, hash_value in enumerate(hashes):
+            merged.setdefault(hashes[find(i)], []).extend(hash_groups[hash_value])
+        return merged
+    
     def process(self) -> Dict[str, Any]:
         """
         Main processing method: extract images, compute hashes, detect duplicates.
@@ -325,9 +440,9 @@ class DiagramExtractor:
         duplicates = self.detect_duplicates(images)
         
         # Mark images that are duplicates
-        duplicate_hashes = {dup["hash"] for dup in duplicates}
+        duplicate_files = {filename for dup in duplicates for filename in dup["files"]}
         for img in images:
-            img["is_duplicate"] = img.get("hash", "") in duplicate_hashes
+            img["is_duplicate"] = img.get("filename", "") in duplicate_files
         
         # Prepare response
         result = {
@@ -362,12 +477,27 @@ def main():
     parser.add_argument("pdf_path", help="Path to input PDF file")
     parser.add_argument("output_dir", help="Base output directory for extracted images")
     parser.add_argument("job_id", help="Unique job identifier")
+    parser.add_argument(
+        "--hash-size",
+        type=int,
+        default=DEFAULT_HASH_SIZE,
+        help=f"pHash size (default: {DEFAULT_HASH_SIZE}; 8 gives faster 64-bit hashes)"
+    )
+    parser.add_argument(
+        "--duplicate-max-distance",
+        type=int,
+        default=0,
+        help="Also group near-duplicates whose hashes differ in at most this many bits (default: 0, identical only)"
+    )
     
     args = parser.parse_args()
     
     try:
         # Create extractor and process PDF
-        extractor = DiagramExtractor(args.pdf_path, args.output_dir, args.job_id)
+        extractor = DiagramExtractor(
+            args.pdf_path, args.output_dir, args.job_id,
+            hash_size=args.hash_size, duplicate_max_distance=args.duplicate_max_distance
+        )
         result = extractor.process()
         
         # Output JSON result
@@ -3,6 +3,7 @@ Image Hashing and Fingerprinting Module
 Generates multiple hash types (pHash, dHash, aHash) and stores in SQLite DB.
 """
 
+import math
 import sys
 import sqlite3
 import json
@@ -10,6 +11,7 @@ import argparse
 from pathlib import Path
 from typing import Dict, Optional, Tuple, List
 from datetime import datetime
+import numpy as np
 from PIL import Image
 import imagehash
 import logging
@@ -21,17 +23,59 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Default hash size (256-bit hashes); hashes are only comparable at the same size
+DEFAULT_HASH_SIZE = 16
+# Modes whose direct grayscale conversion matches going through RGB first
+DIRECT_GRAYSCALE_MODES = frozenset({'RGB', 'L', 'LA', '1', 'P', 'PA', 'RGBA', 'RGBX', 'CMYK'})
+
+# Set bits in each byte value, for popcounting XORed hashes a byte at a time
+_POPCOUNT_TABLE = np.array([bin(i).count('1') for i in range(256)], dtype=np.uint16)
+
+
+def _hash_distance(hash1: str, hash2: str) -> int:
+    """
+    Hamming distance between two hex hash strings, as imagehash's hash1 - hash2.
+    Square hashes of equal size are compared as integers (XOR + popcount), without
+    building ImageHash arrays; anything else goes through imagehash.
+    """
+    bits = len(hash1) * 4
+    if len(hash1) == len(hash2) and math.isqrt(bits) ** 2 == bits:
+        return bin(int(hash1, 16) ^ int(hash2, 16)).count('1')
+    return imagehash.hex_to_hash(hash1) - imagehash.hex_to_hash(hash2)
+
+
+def _hash_distances(query: str, stored: List[str]) -> Optional[np.ndarray]:
+    """
+    Hamming distances from query to each stored hex hash, all of query's length.
+    The hashes are packed into one uint8 array and XORed and popcounted together.
+    Returns None if any stored hash is not valid hex.
+    """
+    hash_bytes = len(query) // 2
+    try:
+        packed = bytes.fromhex(''.join(stored))
+    except ValueError:
+        return None
+    # fromhex also skips whitespace, so check nothing was dropped
+    if len(query) % 2 or len(packed) != hash_bytes * len(stored):
+        return None
+    stored_array = np.frombuffer(packed, dtype=np.uint8).reshape(len(stored), hash_bytes)
+    query_array = np.frombuffer(bytes.fromhex(query), dtype=np.uint8)
+    return _POPCOUNT_TABLE[stored_array ^ query_array].sum(axis=1)
+
 
 class ImageHasher:
     """Handles image hashing and database storage"""
     
-    def __init__(self, db_path: str = None):
+    def __init__(self, db_path: str = None, hash_size: int = DEFAULT_HASH_SIZE):
         """
         Initialize the image hasher.
         
         Args:
             db_path: Path to SQLite database (default: ./data/diagram_hashes.db)
+            hash_size: Hash size; 8 gives 64-bit hashes, which are cheaper to compute
+                but not comparable with hashes stored at the default size
         """
+        self.hash_size = hash_size
         if db_path is None:
             script_dir = Path(__file__).parent.parent
             db_path = script_dir / "data" / "diagram_hashes.db"
@@ -42,11 +86,22 @@ class ImageHasher:
         # Initialize database
         self._init_database()
     
+    def _connect(self) -> sqlite3.Connection:
+        """Open a connection to the hash database"""
+        conn = sqlite3.connect(str(self.db_path))
+        # Safe with WAL: a crash can lose the last commit but not corrupt the DB
+        conn.execute('PRAGMA synchronous=NORMAL')
+        return conn
+    
     def _init_database(self):
         """Create database table if it doesn't exist"""
-        conn = sqlite3.connect(str(self.db_path))
+        conn = self._connect()
         cursor = conn.cursor()
         
+        # WAL avoids a rollback journal per commit and lets concurrent hashing
+        # processes read while one writes; the mode persists in the DB file
+        cursor.execute('PRAGMA journal_mode=WAL')
+        
         cursor.execute('''
             CREATE TABLE IF NOT EXISTS diagram_hashes (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -81,13 +136,15 @@ class ImageHasher:
             pil_image = Image.open(image_path)
             
             # Convert to RGB if necessary
-            if pil_image.mode != 'RGB':
+            if pil_image.mode not in DIRECT_GRAYSCALE_MODES:
                 pil_image = pil_image.convert('RGB')
+            # Every hash below works on grayscale; convert once instead of per hash
+            pil_image = pil_image.convert('L')
             
             # Compute hashes
-            phash = str(imagehash.phash(pil_image, hash_size=16))
-            dhash = str(imagehash.dhash(pil_image, hash_size=16))
-            ahash = str(imagehash.average_hash(pil_image, hash_size=16))
+            phash = str(imagehash.phash(pil_image, hash_size=self.hash_size))
+            dhash = str(imagehash.dhash(pil_image, hash_size=self.hash_size))
+            ahash = str(imagehash.average_hash(pil_image, hash_size=self.hash_size))
             
             return {
                 'pHash': phash,
@@ -109,25 +166,42 @@ class ImageHasher:
         Returns:
             True if successful
         """
-        conn = sqlite3.connect(str(self.db_path))
+        return self.store_hashes_batch([(image_path, hashes)])
+    
+    def store_hashes_batch(self, rows: List[Tuple[str, Dict[str, str]]]) -> bool:
+        """
+        Store hashes for several images in one transaction.
+        
+        Args:
+            rows: (image_path, hashes) pairs, as passed to store_hashes
+        
+        Returns:
+            True if successful (nothing is stored otherwise)
+        """
+        conn = self._connect()
         cursor = conn.cursor()
+        created_at = datetime.now().isoformat()
         
         try:
             # Use INSERT OR REPLACE to handle duplicates
-            cursor.execute('''
+            cursor.executemany('''
                 INSERT OR REPLACE INTO diagram_hashes 
                 (filePath, pHash, dHash, aHash, createdAt)
                 VALUES (?, ?, ?, ?, ?)
-            ''', (
-                image_path,
-                hashes.get('pHash', ''),
-                hashes.get('dHash', ''),
-                hashes.get('aHash', ''),
-                datetime.now().isoformat()
-            ))
+            ''', [
+                (
+                    image_path,
+                    hashes.get('pHash', ''),
+                    hashes.get('dHash', ''),
+                    hashes.get('aHash', ''),
+                    created_at
+                )
+                for image_path, hashes in rows
+            ])
             
             conn.commit()
-            logger.info(f"Stored hashes for: {image_path}")
+            for image_path, _ in rows:
+                logger.info(f"Stored hashes for: {image_path}")
             return True
         except Exception as e:
             logger.error(f"Error storing hashes: {e}")
@@ -149,15 +223,11 @@ class ImageHasher:
             Similarity score between 0 (different) and 1 (identical)
         """
         try:
-            # Convert string hashes to imagehash objects
-            hash_obj1 = imagehash.hex_to_hash(hash1)
-            hash_obj2 = imagehash.hex_to_hash(hash2)
-            
             # Calculate Hamming distance
-            distance = hash_obj1 - hash_obj2
+            distance = _hash_distance(hash1, hash2)
             
-            # Maximum possible distance for hash_size=16 is 256
-            max_distance = 256.0
+            # Maximum possible distance is the number of bits (256 for hash_size=16)
+            max_distance = float(len(hash1) * 4)
             
             # Convert to similarity score (0-1)
             similarity = 1.0 - (distance / max_distance)
@@ -181,35 +251,43 @@ class ImageHasher:
         # Compute hashes for query image
         query_hashes = self.compute_hashes(image_path)
         
-        # Get all stored images
-        conn = sqlite3.connect(str(self.db_path))
+        query_phash = query_hashes['pHash']
+        max_distance = float(len(query_phash) * 4)
+        
+        # Get all stored pHashes (rows without one are never matched)
+        conn = self._connect()
         cursor = conn.cursor()
         
         cursor.execute('''
-            SELECT filePath, pHash, dHash, aHash
+            SELECT filePath, pHash
             FROM diagram_hashes
-            WHERE filePath != ?
+            WHERE filePath != ? AND pHash != ''
         ''', (image_path,))
         
+        rows = cursor.fetchall()
+        similarities = [None] * len(rows)
+        
+        # Compare using pHash (most reliable). Same-size hashes are compared in one
+        # vectorized pass; other sizes and malformed hashes go through compare_hashes
+        same_size = [i for i, (_, stored_phash) in enumerate(rows) if len(stored_phash) == len(query_phash)]
+        if same_size:
+            distances = _hash_distances(query_phash, [rows[i][1] for i in same_size])
+            if distances is not None:
+                for i, similarity in zip(same_size, (1.0 - distances / max_distance).tolist()):
+                    similarities[i] = similarity
+        
         similar_images = []
         
-        for row in cursor.fetchall():
-            stored_path, stored_phash, stored_dhash, stored_ahash = row
+        for (stored_path, stored_phash), similarity in zip(rows, similarities):
+            if similarity is None:
+                similarity = self.compare_hashes(query_phash, stored_phash, 'pHash')
             
-            # Compare using pHash (most reliable)
-            if stored_phash:
-                similarity = self.compare_hashes(
-                    query_hashes['pHash'],
-                    stored_phash,
-                    'pHash'
-                )
-                
-                if similarity >= threshold:
-                    similar_images.append({
-                        'filePath': stored_path,
-                        'similarity': similarity,
-                        'hash_type': 'pHash'
-                    })
+            if similarity >= threshold:
+                similar_images.append({
+                    'filePath': stored_path,
+                    'similarity': similarity,
+                    'hash_type': 'pHash'
+                })
         
         conn.close()
         
@@ -224,12 +302,23 @@ def main():
     parser = argparse.ArgumentParser(
         description="Compute and store image hashes"
     )
-    parser.add_argument("image_path", help="Path to image file")
+    parser.add_argument(
+        "image_paths",
+        nargs="+",
+        metavar="image_path",
+        help="Path to image file (several are hashed and stored in one transaction)"
+    )
     parser.add_argument(
         "--db-path",
         default=None,
         help="Path to SQLite database (default: ./data/diagram_hashes.db)"
     )
+    parser.add_argument(
+        "--hash-size",
+        type=int,
+        default=DEFAULT_HASH_SIZE,
+        help=f"Hash size (default: {DEFAULT_HASH_SIZE}; 8 gives faster 64-bit hashes)"
+    )
     parser.add_argument(
         "--compare",
         help="Compare with another image path"
@@ -241,19 +330,22 @@ def main():
     )
     
     args = parser.parse_args()
+    if (args.compare or args.find_similar) and len(args.image_paths) > 1:
+        parser.error("--compare and --find-similar take a single image_path")
+    image_path = args.image_paths[0]
     
-    hasher = ImageHasher(args.db_path)
+    hasher = ImageHasher(args.db_path, hash_size=args.hash_size)
     
     try:
         if args.compare:
             # Compare two images
-            hashes1 = hasher.compute_hashes(args.image_path)
+            hashes1 = hasher.compute_hashes(image_path)
             hashes2 = hasher.compute_hashes(args.compare)
             
             similarity = hasher.compare_hashes(hashes1['pHash'], hashes2['pHash'])
             
             result = {
-                'image1': args.image_path,
+                'image1': image_path,
                 'image2': args.compare,
                 'similarity': similarity,
                 'hashes1': hashes1,
@@ -264,9 +356,9 @@ def main():
         
         elif args.find_similar:
             # Find similar images
-            similar = hasher.find_similar(args.image_path, threshold=0.8)
+            similar = hasher.find_similar(image_path, threshold=0.8)
             result = {
-                'query_image': args.image_path,
+                'query_image': image_path,
                 'similar_images': similar,
                 'count': len(similar)
             }
@@ -274,14 +366,18 @@ def main():
         
         else:
             # Compute and store hashes
-            hashes = hasher.compute_hashes(args.image_path)
-            hasher.store_hashes(args.image_path, hashes)
+            rows = [(image_path, hasher.compute_hashes(image_path)) for image_path in args.image_paths]
+            hasher.store_hashes_batch(rows)
             
-            result = {
-                'image_path': args.image_path,
-                'hashes': hashes,
-                'stored': True
-            }
+            results = [
+                {
+                    'image_path': image_path,
+                    'hashes': hashes,
+                    'stored': True
+                }
+                for image_path, hashes in rows
+            ]
+            result = results[0] if len(results) == 1 else results
             
             print(json.dumps(result, indent=2))
         